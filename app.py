@@ -1,19 +1,18 @@
 import streamlit as st
 import datetime
-import pandas as pd
-import numpy as np
 import os
 from dotenv import load_dotenv
-import sqlite3
 import hashlib
 import secrets
-import smtplib
-from email.mime.text import MIMEText
-from twilio.rest import Client
-import ssl
 import random
 import urllib.parse # Used for encoding SVG for URL
 import time # For simulated delays
+import threading
+# Only light modules at import time: pandas, numpy, twilio, smtplib and the trading
+# stack are imported on first use, so a cold start can paint the landing page quickly
+from trading.db import get_pool
+from trading.outbox import get_outbox
+from trading.telemetry import registry as telemetry, start_exporters, startup_report, startup_stage, timed
 
 # --- Load environment variables ---
 load_dotenv()
@@ -21,34 +20,61 @@ load_dotenv()
 # but included for completeness if you re-introduce actual trading logic.
 BINANCE_API_KEY = os.getenv("BINANCE_API_KEY")
 BINANCE_SECRET_KEY = os.getenv("BINANCE_SECRET_KEY")
-SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = int(os.getenv("SMTP_PORT", 465)) # Default to 465 for SSL
-SMTP_USER = os.getenv("SMTP_USER")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+# SMTP_* settings are read by trading/outbox.py, which delivers email in the background
 TWILIO_SID = os.getenv("TWILIO_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE = os.getenv("TWILIO_PHONE")
-
-# --- Initialize Twilio client (only if credentials are provided) ---
-twilio_client = None
-if TWILIO_SID and TWILIO_AUTH_TOKEN and TWILIO_PHONE:
-    try:
-        twilio_client = Client(TWILIO_SID, TWILIO_AUTH_TOKEN)
-        # st.sidebar.success("Twilio client initialized.") # For debugging, remove in production
-    except Exception as e:
-        st.sidebar.error(f"Error initializing Twilio: {e}")
-else:
+TWILIO_CONFIGURED = bool(TWILIO_SID and TWILIO_AUTH_TOKEN and TWILIO_PHONE)
+DB_PATH = os.getenv("DB_PATH", "users.db") # Users, reset tokens and the trade ledger
+# Same setting as trading/worker.py, read here so the page does not import the trading stack to get it
+BOT_TICK_INTERVAL = float(os.getenv("BOT_TICK_INTERVAL", 10))
+# Number of past ticks per symbol the strategies look back over
+PRICE_HISTORY_WINDOW = int(os.getenv("PRICE_HISTORY_WINDOW", 20))
+PAGE_SIZES = [25, 50, 100, 250] # Rows-per-page choices for the dashboard trade tables
+OUTBOX_STATUS_POLL = 2 # Seconds between checks of a queued 2FA/reset message's delivery status
+# Comma-separated emails that see the performance telemetry panel
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+# Prometheus endpoint/file, if METRICS_PORT/METRICS_FILE are set (once per process)
+start_exporters()
+
+# --- Twilio (the client is built by the outbox dispatcher on the first SMS, not at startup) ---
+if not TWILIO_CONFIGURED:
     st.sidebar.warning("Twilio environment variables not fully set. SMS 2FA will not function.")
 
 # --- Database setup ---
-# Using check_same_thread=False for Streamlit's multi-threading environment
-conn = sqlite3.connect('users.db', check_same_thread=False)
-c = conn.cursor()
-c.execute('''CREATE TABLE IF NOT EXISTS users
-             (email TEXT PRIMARY KEY, password_hash TEXT, phone TEXT)''')
-c.execute('''CREATE TABLE IF NOT EXISTS reset_tokens
-             (email TEXT, token TEXT, expiry DATETIME)''')
-conn.commit()
+# Per-thread connections from a process-wide pool: Streamlit sessions never share a cursor
+db = get_pool(DB_PATH)
+
+@st.cache_resource(show_spinner=False)
+def init_db():
+    """Creates the auth tables once per process instead of on every rerun."""
+    with startup_stage("auth database"), db.transaction() as conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS users
+                     (email TEXT PRIMARY KEY, password_hash TEXT, phone TEXT)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS reset_tokens
+                     (email TEXT, token TEXT, expiry DATETIME)''')
+    return True
+
+init_db()
+
+@st.cache_resource(show_spinner=False)
+def start_trading_worker():
+    """
+    Starts the trading worker once per process, before anyone logs in, so bots running
+    before a restart resume and scheduled sessions fire. It is loaded in a background
+    thread so the landing page does not wait for the trading stack.
+    """
+    def load():
+        with startup_stage("trading stack import"):
+            from trading.worker import get_worker
+        with startup_stage("trading worker"):
+            get_worker()
+    thread = threading.Thread(target=load, name="trading-worker-start", daemon=True)
+    thread.start()
+    return thread
+
+start_trading_worker()
 
 # --- Custom CSS for Professional Green and Gold Theme & Responsiveness ---
 def apply_custom_css():
@@ -279,37 +305,68 @@ def apply_custom_css():
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
+# Both only queue the message in the outbox (trading/outbox.py) and return its row id (None if it
+# could not be queued); the dispatcher delivers it in the background, with retries, so a rerun never
+# waits on SMTP or Twilio. delivery_status() shows how that delivery went.
 def send_email(to_email, subject, body):
-    if not all([SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASSWORD]):
+    if not get_outbox().configured("email"):
         st.error("Email server configuration missing. Cannot send email.")
-        return False
-    
-    msg = MIMEText(body)
-    msg['Subject'] = subject
-    msg['From'] = SMTP_USER
-    msg['To'] = to_email
-    
+        return None
     try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context) as server:
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(SMTP_USER, to_email, msg.as_string())
-        return True
+        return get_outbox().send_email(to_email, subject, body)
     except Exception as e:
         st.error(f"Error sending email: {e}")
-        return False
+        return None
 
 def send_sms(to_phone, body):
-    if not twilio_client:
+    if not TWILIO_CONFIGURED:
         st.error("Twilio client not initialized. Cannot send SMS.")
-        return False
-    
+        return None
     try:
-        twilio_client.messages.create(body=body, from_=TWILIO_PHONE, to=to_phone)
-        return True
+        return get_outbox().send_sms(to_phone, body)
     except Exception as e:
         st.error(f"Error sending SMS: {e}")
-        return False
+        return None
+
+def delivery_status(key, what, resend=None):
+    """Delivery state of the queued message whose outbox id is in st.session_state[key]; polled only until it is final."""
+    row_id = st.session_state.get(key)
+    if not row_id:
+        return
+    final = st.session_state.get(f"{key}_final")
+    if final is not None and final[0] == row_id:
+        _show_delivery(final[1], key, what, resend)
+    else:
+        _poll_delivery(key, what, resend)
+
+@st.fragment(run_every=OUTBOX_STATUS_POLL)
+def _poll_delivery(key, what, resend):
+    row_id = st.session_state.get(key)
+    status = get_outbox().status(row_id)
+    if status is None or status["status"] in ("sent", "failed"):
+        st.session_state[f"{key}_final"] = (row_id, status)
+        st.rerun() # the full rerun shows the final state without this fragment, which stops the polling
+    _show_delivery(status, key, what, resend)
+
+def _show_delivery(status, key, what, resend):
+    if status is None:
+        return
+    if status["status"] == "failed":
+        st.error(f"We could not deliver your {what}: {status['error'] or 'unknown error'}.")
+        if resend is not None:
+            st.button(f"Resend {what}", key=f"{key}_resend", on_click=resend)
+    elif status["status"] == "sent":
+        st.caption(f"Your {what} has been sent.")
+    elif status["attempts"]:
+        st.caption(f"Still trying to send your {what} ({status['attempts']} failed attempt(s) so far)...")
+    else:
+        st.caption(f"Sending your {what}...")
+
+def send_2fa_code():
+    code = str(random.randint(100000, 999999))
+    st.session_state.two_fa_code = code
+    st.session_state.two_fa_message = send_sms(st.session_state.two_fa_phone, f"Your MBU Trading Bot 2FA code is {code}")
+    return st.session_state.two_fa_message
 
 # --- Streamlit Session State Management ---
 if "authenticated" not in st.session_state:
@@ -336,14 +393,6 @@ if 'show_change_password' not in st.session_state:
     st.session_state.show_change_password = False
 if 'bot_running' not in st.session_state:
     st.session_state.bot_running = False
-if 'start_time' not in st.session_state:
-    st.session_state.start_time = None
-if 'open_positions' not in st.session_state:
-    st.session_state.open_positions = {}
-if 'trades_executed' not in st.session_state:
-    st.session_state.trades_executed = []
-if 'total_profit' not in st.session_state:
-    st.session_state.total_profit = 0.0
 
 # --- Authentication Forms ---
 def login_form():
@@ -374,16 +423,14 @@ def login_form():
         password = st.session_state.login_password
         
         if email:
-            c.execute("SELECT password_hash, phone FROM users WHERE email = ?", (email,))
-            result = c.fetchone()
+            result = db.fetchone("SELECT password_hash, phone FROM users WHERE email = ?", (email,))
             if result and hash_password(password) == result[0]:
                 st.session_state.login_error = ""
                 st.session_state.user_email = email
                 phone = result[1]
-                if phone and twilio_client: # Only attempt 2FA if phone is registered and Twilio is active
-                    code = str(random.randint(100000, 999999))
-                    st.session_state.two_fa_code = code
-                    if send_sms(phone, f"Your MBU Trading Bot 2FA code is {code}"):
+                if phone and TWILIO_CONFIGURED: # Only attempt 2FA if phone is registered and Twilio is active
+                    st.session_state.two_fa_phone = phone
+                    if send_2fa_code():
                         st.success("2FA code sent to your phone.")
                         st.session_state.authenticated = True # Temporarily authenticate for 2FA screen
                         st.session_state.two_fa_passed = False # Indicate 2FA is pending
@@ -428,26 +475,29 @@ def signup_form():
         elif password != confirm_password:
             st.session_state.login_error = "Passwords do not match."
         else:
-            c.execute("SELECT * FROM users WHERE email = ?", (email,))
-            if c.fetchone():
-                st.session_state.login_error = "Email already registered."
+            hashed_pw = hash_password(password)
+            try:
+                with db.transaction() as conn:
+                    taken = conn.execute("SELECT 1 FROM users WHERE email = ?", (email,)).fetchone()
+                    if not taken:
+                        conn.execute("INSERT INTO users (email, password_hash, phone) VALUES (?, ?, ?)", (email, hashed_pw, phone if phone else None))
+            except Exception as e:
+                st.session_state.login_error = f"Account creation failed: {e}"
             else:
-                hashed_pw = hash_password(password)
-                try:
-                    c.execute("INSERT INTO users (email, password_hash, phone) VALUES (?, ?, ?)", (email, hashed_pw, phone if phone else None))
-                    conn.commit()
+                if taken:
+                    st.session_state.login_error = "Email already registered."
+                else:
                     st.session_state.signup_success = True
                     st.session_state.show_signup = False # Switch back to login after success
                     st.session_state.login_error = "" # Clear any previous error
                     st.rerun()
-                except Exception as e:
-                    st.session_state.login_error = f"Account creation failed: {e}"
 
 def two_fa_form():
     """Displays the 2FA form."""
     with st.container():
         st.subheader("Two-Factor Authentication")
         st.write(f"A 6-digit code has been sent to your registered phone for {st.session_state.user_email}.")
+        delivery_status("two_fa_message", "2FA code", resend=send_2fa_code)
         two_fa_input = st.text_input("Enter 6-digit code", max_chars=6, key="2fa_input")
 
         st.button("Verify 2FA", key="2fa_verify_button")
@@ -471,17 +521,17 @@ def forgot_password_form():
         
         if st.session_state.get('send_reset_token_button'):
             email = st.session_state.forgot_email
-            c.execute("SELECT * FROM users WHERE email = ?", (email,))
-            if c.fetchone():
+            if db.fetchone("SELECT 1 FROM users WHERE email = ?", (email,)):
                 token = secrets.token_urlsafe(32) # More secure than hex
                 expiry = datetime.datetime.now() + datetime.timedelta(hours=1)
-                c.execute("INSERT OR REPLACE INTO reset_tokens (email, token, expiry) VALUES (?, ?, ?)", (email, token, expiry))
-                conn.commit()
+                with db.transaction() as conn:
+                    conn.execute("INSERT OR REPLACE INTO reset_tokens (email, token, expiry) VALUES (?, ?, ?)", (email, token, expiry))
                 
                 reset_link = f"https://mbutradingbot.com/reset_password?token={token}&email={email}" # Placeholder URL
                 email_body = f"Hello,\n\nYou requested a password reset for your MBU Trading Bot account.\n\nPlease click on the following link to reset your password: {reset_link}\n\nThis link is valid for 1 hour. If you did not request a password reset, please ignore this email.\n\nThank you,\nMBU Trading Bot Team"
                 
-                if send_email(email, "MBU Trading Bot Password Reset", email_body):
+                st.session_state.reset_message = send_email(email, "MBU Trading Bot Password Reset", email_body)
+                if st.session_state.reset_message:
                     st.session_state.reset_token_sent = True
                     st.success("A password reset link has been sent to your email address.")
                     st.session_state.login_error = "" # Clear error
@@ -492,6 +542,7 @@ def forgot_password_form():
         
         if st.session_state.reset_token_sent:
             st.info("Check your email for the reset link. If you didn't receive it, check your spam folder.")
+            delivery_status("reset_message", "password reset email") # on failure, Send Reset Link/Token again
             
         st.markdown("---")
         st.button("Back to Login", key="back_to_login_from_forgot", on_click=lambda: st.session_state.update(show_forgot_password=False, login_error="", reset_token_sent=False))
@@ -516,12 +567,14 @@ def reset_password_page_placeholder():
         elif new_password != confirm_new_password:
             st.error("Passwords do not match.")
         else:
-            c.execute("SELECT * FROM reset_tokens WHERE email = ? AND token = ? AND expiry > ?", (email_for_reset, token, datetime.datetime.now()))
-            if c.fetchone():
-                hashed_pw = hash_password(new_password)
-                c.execute("UPDATE users SET password_hash = ? WHERE email = ?", (hashed_pw, email_for_reset))
-                c.execute("DELETE FROM reset_tokens WHERE email = ?", (email_for_reset,))
-                conn.commit()
+            hashed_pw = hash_password(new_password)
+            with db.transaction() as conn:
+                # Token check and password update in one transaction so a token is only used once
+                valid = conn.execute("SELECT 1 FROM reset_tokens WHERE email = ? AND token = ? AND expiry > ?", (email_for_reset, token, datetime.datetime.now())).fetchone()
+                if valid:
+                    conn.execute("UPDATE users SET password_hash = ? WHERE email = ?", (hashed_pw, email_for_reset))
+                    conn.execute("DELETE FROM reset_tokens WHERE email = ?", (email_for_reset,))
+            if valid:
                 st.success("Password has been reset successfully. You can now log in.")
                 st.session_state.show_forgot_password = False # Exit reset flow
                 st.session_state.show_auth_forms = True # Go to login form
@@ -548,12 +601,11 @@ def change_password_form():
         elif new_password != confirm_new_password:
             st.error("New passwords do not match.")
         else:
-            c.execute("SELECT password_hash FROM users WHERE email = ?", (email,))
-            result = c.fetchone()
+            result = db.fetchone("SELECT password_hash FROM users WHERE email = ?", (email,))
             if result and hash_password(old_password) == result[0]:
                 hashed_pw = hash_password(new_password)
-                c.execute("UPDATE users SET password_hash = ? WHERE email = ?", (hashed_pw, email))
-                conn.commit()
+                with db.transaction() as conn:
+                    conn.execute("UPDATE users SET password_hash = ? WHERE email = ?", (hashed_pw, email))
                 st.success("Password changed successfully!")
                 st.session_state.show_change_password = False # Go back to dashboard
                 st.rerun()
@@ -581,258 +633,156 @@ def landing_page():
 
     st.markdown("</div>", unsafe_allow_html=True)
 
-# Placeholder for actual trading logic (e.g., Binance integration, strategy execution)
-# These functions would interact with external APIs (like CCXT) if fully implemented.
-def get_live_price(symbol):
-    # Dummy function for now, to simulate price fluctuations
-    # More realistic: fetch from a real exchange API (e.g., CCXT)
-    prices = {
-        "BTC/USDT": random.uniform(25000, 30000),
-        "ETH/USDT": random.uniform(1500, 2000),
-        "SOL/USDT": random.uniform(100, 150),
-        "ADA/USDT": random.uniform(0.3, 0.5),
-    }
-    return prices.get(symbol, random.uniform(1, 10))
-
-
-def get_trading_signal(strategy_name, current_price, history_prices):
-    # Simplified dummy signal generation for demo
-    if strategy_name == "Momentum":
-        if len(history_prices) > 5:
-            if current_price > history_prices.iloc[-1] * 1.005: # Price increased recently
-                return "BUY"
-            elif current_price < history_prices.iloc[-1] * 0.995: # Price decreased recently
-                return "SELL"
-    elif strategy_name == "Breakout":
-        if len(history_prices) > 10:
-            if current_price > history_prices.max() * 1.01: # Broke above recent high
-                return "BUY"
-            elif current_price < history_prices.min() * 0.99: # Broke below recent low
-                return "SELL"
-    elif strategy_name == "Mean Reversion":
-        if len(history_prices) > 10:
-            mean_price = history_prices.mean()
-            if current_price < mean_price * 0.99: # Price below mean
-                return "BUY"
-            elif current_price > mean_price * 1.01: # Price above mean
-                return "SELL"
-    return "HOLD" # Default
-
-def execute_trade_demo(symbol, side, quantity, price):
-    """Simulates executing a trade and updates session state."""
-    st.sidebar.info(f"DEMO: Executing trade: {side} {quantity} of {symbol} at {price:.2f}")
-    trade_info = {
-        "Date": datetime.datetime.now(),
-        "Symbol": symbol,
-        "Side": side,
-        "Quantity": quantity,
-        "Entry_Price": price,
-        "P/L": 0, # P/L is calculated on close
-        "Status": "OPEN"
-    }
-    st.session_state.open_positions[symbol] = trade_info
-    st.success(f"DEMO: OPENED trade: {side} {quantity} {symbol.split('/')[0]} at ${price:.2f}")
-
-def close_trade_demo(symbol, current_price):
-    """Simulates closing a trade and updates session state."""
-    position = st.session_state.open_positions.pop(symbol) # Remove from open positions
-    entry_price = position['Entry_Price']
-    side = position['Side']
-    quantity = position['Quantity']
-    
-    # Calculate dummy profit/loss (simplified for demo, no real fees)
-    if side == "BUY":
-        profit_loss = (current_price - entry_price) * quantity
-    else: # SELL
-        profit_loss = (entry_price - current_price) * quantity
-    
-    st.session_state.total_profit += profit_loss
-    
-    trade_log = {
-        "Date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Symbol": symbol,
-        "Side": side,
-        "Quantity": quantity,
-        "P/L": profit_loss,
-        "Cumulative P/L": st.session_state.total_profit,
-        "Reason": "Bot Close"
-    }
-    st.session_state.trades_executed.append(trade_log)
-    st.success(f"DEMO: CLOSED trade: {side} {quantity} {symbol.split('/')[0]} at ${current_price:.2f} | P/L: ${profit_loss:.2f}")
-
-def calculate_metrics_demo(trades):
-    """Calculates demo trading metrics."""
-    if not trades:
-        return {"Sharpe Ratio": 0, "Max Drawdown": 0, "Win Ratio": 0}
-    df = pd.DataFrame(trades)
-    df['Date'] = pd.to_datetime(df['Date'])
-    df['Cumulative P/L'] = df['P/L'].cumsum()
-    
-    # Simplified metrics for demo
-    returns = df['P/L']
-    sharpe_ratio = returns.mean() / returns.std() * np.sqrt(365) if returns.std() != 0 else 0
-    
-    cumulative_returns = df['Cumulative P/L']
-    peak = cumulative_returns.expanding().max()
-    drawdown = (cumulative_returns - peak) / peak
-    max_drawdown = drawdown.min() if not drawdown.empty else 0
-    
-    win_ratio = len(df[df['P/L'] > 0]) / len(df) if len(df) > 0 else 0
-    
-    return {"Sharpe Ratio": sharpe_ratio, "Max Drawdown": max_drawdown, "Win Ratio": win_ratio}
-
-def run_trading_bot_logic(strategy_name, min_profit, max_loss, crypto_to_trade):
-    """Simulates the core trading bot logic for demonstration."""
-    for symbol in crypto_to_trade:
-        current_price = get_live_price(symbol)
-        if not current_price:
-            continue
-
-        # Keep a short history for signal generation
-        if symbol not in st.session_state:
-            st.session_state[f'{symbol}_history'] = pd.Series([])
-        
-        current_history = st.session_state[f'{symbol}_history']
-        current_history = pd.concat([current_history, pd.Series([current_price])]).tail(20)
-        st.session_state[f'{symbol}_history'] = current_history
-
-        # Check for open positions first
-        if symbol in st.session_state.open_positions:
-            position = st.session_state.open_positions[symbol]
-            entry_price = position['Entry_Price']
-            
-            # Simple profit/loss check
-            if position['Side'] == "BUY":
-                profit_pct = (current_price - entry_price) / entry_price * 100
-                if profit_pct >= min_profit or profit_pct <= -max_loss: # Trigger close on profit or loss
-                    close_trade_demo(symbol, current_price)
-            else: # SELL position
-                profit_pct = (entry_price - current_price) / entry_price * 100
-                if profit_pct >= min_profit or profit_pct <= -max_loss: # Trigger close on profit or loss
-                    close_trade_demo(symbol, current_price)
-        else:
-            # If no open position, look for new signals
-            signal = get_trading_signal(strategy_name, current_price, current_history)
-            
-            if signal in ["BUY", "SELL"]:
-                # Use a small, dummy quantity for demo purposes
-                quantity = 0.01 # Example small quantity
-                execute_trade_demo(symbol, signal, quantity, current_price)
-    
+def _bot_snapshot(bot):
+    """Copies what the dashboard renders while holding the bot lock, so the worker can keep ticking."""
+    with bot.lock:
+        return {
+            "running": bot.running,
+            "total_profit": bot.total_profit,
+            "metrics": bot.metrics(),
+            "open_positions": list(bot.open_positions.values()),
+            "trade_count": len(bot.trades_executed),
+            "events": list(bot.events)[-5:],
+            "last_run_time": bot.last_run_time,
+        }
+
+
+def trade_table(bot, key):
+    """One page of the bot's session trades (newest first) from the ledger, with symbol, side and date filters."""
+    from trading.trade_table import DEFAULT_PAGE_SIZE, TradeTable
+    from trading.worker import get_worker
+    # Kept across reruns so only trades closed since the last one are read (a new session starts a new table)
+    table = st.session_state.get(f"{key}_table")
+    if table is None or (table.user, table.since) != (bot.user, bot.start_time):
+        table = st.session_state[f"{key}_table"] = TradeTable(get_worker().ledger, bot.user, since=bot.start_time)
+    col1, col2, col3 = st.columns(3)
+    symbols = col1.multiselect("Symbol", table.symbols, key=f"{key}_symbols")
+    sides = col2.multiselect("Side", ["BUY", "SELL"], key=f"{key}_sides")
+    dates = col3.date_input("Closed Between", value=(), key=f"{key}_dates")
+    start = dates[0] if len(dates) > 0 else None
+    end = dates[1] + datetime.timedelta(days=1) if len(dates) > 1 else None # inclusive end date
+
+    page_size = st.session_state.get(f"{key}_page_size", DEFAULT_PAGE_SIZE)
+    page = st.session_state.get(f"{key}_page", 1)
+    frame, total = table.page(page - 1, page_size, symbols, sides, start, end)
+    pages = max(1, -(-total // page_size))
+    if page > pages: # filters narrowed the result; jump back to the last page
+        page = st.session_state[f"{key}_page"] = pages
+        frame, total = table.page(page - 1, page_size, symbols, sides, start, end)
+    st.dataframe(frame, width='stretch', hide_index=True)
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    col1.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    col2.selectbox("Rows", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key=f"{key}_page_size")
+    col3.caption(f"{total:,} matching trade(s), page {page} of {pages}")
+
+
+def schedule_controls(worker, bot, strategy, min_profit, max_loss, symbols, timeframe, signal_timeframe):
+    """Sidebar form for starting the bot automatically at the user's local trade times."""
+    import zoneinfo
+    scheduler = worker.scheduler
+    user = st.session_state.user_email
+    saved = scheduler.get_schedule(user)
+    with st.sidebar.expander("Trading Schedule", expanded=False):
+        zones = sorted(zoneinfo.available_timezones())
+        tz = st.selectbox("Timezone", zones, index=zones.index(saved["tz"] if saved else "UTC"), key="schedule_tz")
+        times = st.text_input("Start Times (HH:MM, comma-separated)", value=", ".join(saved["times"]) if saved else "09:30", key="schedule_times")
+        per_day = st.number_input("Sessions per Day", min_value=1, max_value=24, value=saved["trades_per_day"] if saved else 1, key="schedule_per_day")
+        if saved and saved["next_fire"]:
+            next_local = datetime.datetime.fromtimestamp(saved["next_fire"], zoneinfo.ZoneInfo(saved["tz"]))
+            st.caption(f"Next session: {next_local:%Y-%m-%d %H:%M %Z}")
+        if st.button("Save Schedule", key="save_schedule"):
+            try:
+                # Scheduled sessions run with the settings above, saved with the bot's session
+                worker.configure_bot(user, strategy, min_profit, max_loss, symbols, timeframe, signal_timeframe)
+                scheduler.set_schedule(user, tz, times, per_day)
+                worker.ensure_running()
+                st.rerun()
+            except ValueError as e:
+                st.error(f"Invalid schedule: {e}")
+        if saved and st.button("Remove Schedule", key="remove_schedule"):
+            scheduler.remove(user)
+            st.rerun()
+
+
+def _mark_settings_changed():
+    st.session_state.bot_settings_changed = True
 
+
+@timed("dashboard_render_seconds", section="page")
 def dashboard_main_content():
     """Content for the main dashboard page after login."""
     st.title(f"Welcome to your MBU Trading Bot Dashboard, {st.session_state.user_email.split('@')[0].capitalize()}!")
     st.write("Monitor your automated trading activity and manage bot settings here.")
 
+    # The bot itself runs in the per-process background worker; this page only configures and reads it
+    with startup_stage("trading stack import"):
+        from trading.worker import get_worker
+    with startup_stage("trading worker"):
+        worker = get_worker()
+    bot = worker.bot_for(st.session_state.user_email, window=PRICE_HISTORY_WINDOW)
+    st.session_state.bot_running = bot.running
+
     # Bot Controls in Sidebar
     st.sidebar.header("Bot Controls")
     
+    # Trading Parameters (read before the toggle so Start uses the current settings)
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("Trading Parameters")
+    
+    # Ensure keys are unique across widgets. Defaults come from the bot, so a reload or a new tab
+    # shows its current settings; only an actual widget change (on_change) reconfigures it.
+    strategies = ["Momentum", "Breakout", "Mean Reversion"]
+    durations = ["Continuous", "1 hour", "1 day"]
+    assets = ["BTC/USDT", "ETH/USDT", "SOL/USDT", "ADA/USDT"]
+    signal_options = ["Every Tick", "1m", "5m", "1h", "1d"]
+    strategy = st.sidebar.radio("Strategy", strategies, index=strategies.index(bot.strategy) if bot.strategy in strategies else 0, key="strategy_select", on_change=_mark_settings_changed)
+    timeframe = st.sidebar.radio("Run Duration", durations, index=durations.index(bot.timeframe) if bot.timeframe in durations else 0, key="timeframe_select", on_change=_mark_settings_changed)
+    min_profit = st.sidebar.slider("Min Profit %", 0.1, 5.0, min(max(float(bot.min_profit), 0.1), 5.0), 0.1, key="min_profit_slider", on_change=_mark_settings_changed)
+    max_loss = st.sidebar.slider("Max Loss %", 0.1, 5.0, min(max(float(bot.max_loss), 0.1), 5.0), 0.1, key="max_loss_slider", on_change=_mark_settings_changed)
+    crypto_to_trade = st.sidebar.multiselect("Tradeable Assets", assets, default=[s for s in bot.symbols if s in assets] or ["BTC/USDT", "ETH/USDT"], key="crypto_select", on_change=_mark_settings_changed)
+    signal_bars = st.sidebar.radio("Signal On", signal_options, index=signal_options.index(bot.signal_timeframe) if bot.signal_timeframe in signal_options else 0, key="signal_bars_select", on_change=_mark_settings_changed, help="Evaluate entry signals on every price tick or only when a bar of this length closes.")
+    signal_timeframe = None if signal_bars == "Every Tick" else signal_bars
+    settings_changed = st.session_state.pop("bot_settings_changed", False)
+
+    schedule_controls(worker, bot, strategy, min_profit, max_loss, crypto_to_trade, timeframe, signal_timeframe)
+
     # Bot Status Toggle
-    if st.session_state.bot_running:
+    if bot.running:
+        # Setting changes take effect on the worker's next tick
+        if settings_changed:
+            worker.configure_bot(st.session_state.user_email, strategy, min_profit, max_loss, crypto_to_trade, timeframe, signal_timeframe)
         if st.sidebar.button("🔴 Stop Bot", key="stop_bot"):
+            worker.stop_bot(st.session_state.user_email)
             st.session_state.bot_running = False
             st.sidebar.success("Bot has been stopped.")
             st.rerun() # Refresh the page to update UI
     else:
         if st.sidebar.button("🟢 Start Bot", key="start_bot"):
+            # Starting resets trades and profit (for fresh demo)
+            worker.start_bot(st.session_state.user_email, strategy, min_profit, max_loss, crypto_to_trade, timeframe, signal_timeframe)
             st.session_state.bot_running = True
-            st.session_state.start_time = datetime.datetime.now()
-            # Reset trades and profit when starting (for fresh demo)
-            st.session_state.open_positions = {}
-            st.session_state.trades_executed = []
-            st.session_state.total_profit = 0.0
             st.sidebar.success("Bot started! Monitoring markets...")
             st.rerun() # Refresh the page to update UI
-    
-    # Trading Parameters
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("Trading Parameters")
-    
-    # Ensure keys are unique across widgets
-    strategy = st.sidebar.radio("Strategy", ["Momentum", "Breakout", "Mean Reversion"], index=0, key="strategy_select")
-    timeframe = st.sidebar.radio("Run Duration", ["Continuous", "1 hour", "1 day"], index=0, key="timeframe_select")
-    min_profit = st.sidebar.slider("Min Profit %", 0.1, 5.0, 0.5, 0.1, key="min_profit_slider")
-    max_loss = st.sidebar.slider("Max Loss %", 0.1, 5.0, 1.0, 0.1, key="max_loss_slider")
-    crypto_to_trade = st.sidebar.multiselect("Tradeable Assets", ["BTC/USDT", "ETH/USDT", "SOL/USDT", "ADA/USDT"], default=["BTC/USDT", "ETH/USDT"], key="crypto_select")
 
     # --- Live Dashboard Section ---
     st.markdown("<div class='dashboard-section'>", unsafe_allow_html=True)
     st.subheader("Live Trading Dashboard")
     
-    if st.session_state.bot_running:
-        st.info("Bot is running! Live data will update every 10 seconds (demo rate).")
-        placeholder = st.empty()
-        
-        end_time = None
-        if timeframe == "1 hour":
-            end_time = st.session_state.start_time + datetime.timedelta(hours=1)
-        elif timeframe == "1 day":
-            end_time = st.session_state.start_time + datetime.timedelta(days=1)
-        
-        # Loop for live updates (in a real app, this would be a background process)
-        # Using a simple loop and rerun for demonstration.
-        
-        if 'last_run_time' not in st.session_state:
-            st.session_state.last_run_time = datetime.datetime.now()
-        
-        # Check if 10 seconds have passed since last update or if it's the very first run
-        if (datetime.datetime.now() - st.session_state.last_run_time).total_seconds() >= 10:
-            run_trading_bot_logic(strategy, min_profit, max_loss, crypto_to_trade)
-            st.session_state.last_run_time = datetime.datetime.now()
-            st.rerun() # Trigger a rerun to update the display
-
-        with placeholder.container():
-            st.write(f"Last updated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            current_metrics = calculate_metrics_demo(st.session_state.trades_executed)
-            
-            colA, colB, colC, colD = st.columns(4)
-            with colA:
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.metric("Total P/L", f"${st.session_state.total_profit:.2f}")
-                st.markdown("</div>", unsafe_allow_html=True)
-            with colB:
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.metric("Sharpe Ratio", f"{current_metrics['Sharpe Ratio']:.2f}")
-                st.markdown("</div>", unsafe_allow_html=True)
-            with colC:
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.metric("Max Drawdown", f"{current_metrics['Max Drawdown']:.2%}")
-                st.markdown("</div>", unsafe_allow_html=True)
-            with colD:
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.metric("Win Ratio", f"{current_metrics['Win Ratio']:.2%}")
-                st.markdown("</div>", unsafe_allow_html=True)
-
-            st.markdown("---")
-            st.subheader("Open Positions")
-            if st.session_state.open_positions:
-                st.dataframe(pd.DataFrame(list(st.session_state.open_positions.values())), width='stretch') # Changed to width='stretch'
-            else:
-                st.info("No open positions.")
-            
-            st.markdown("---")
-            st.subheader("Trades Executed")
-            if st.session_state.trades_executed:
-                st.dataframe(pd.DataFrame(st.session_state.trades_executed).iloc[::-1], width='stretch') # Changed to width='stretch'
-            else:
-                st.info("No trades executed yet.")
-        
-        # Check if trading duration has ended
-        if end_time and datetime.datetime.now() > end_time:
-            st.session_state.bot_running = False
-            st.warning(f"Trading period of {timeframe} ended. Bot stopped.")
-            st.rerun()
-
+    if bot.running:
+        st.info(f"Bot is running! Live data will update every {worker.interval:g} seconds (demo rate).")
+        live_dashboard(bot)
     else:
         st.warning("Bot is currently stopped. Click 'Start Bot' in the sidebar to begin simulated trading.")
         st.markdown("---")
         st.subheader("Last Session Summary")
-        if st.session_state.trades_executed:
-            last_metrics = calculate_metrics_demo(st.session_state.trades_executed)
+        snap = _bot_snapshot(bot)
+        for _, message in snap["events"]:
+            st.caption(message)
+        if snap["trade_count"]:
+            last_metrics = snap["metrics"]
             st.markdown(f"<div class='metric-card'>", unsafe_allow_html=True)
-            st.metric("Total P/L", f"${st.session_state.total_profit:.2f}")
+            st.metric("Total P/L", f"${snap['total_profit']:.2f}")
             st.markdown("</div>", unsafe_allow_html=True)
             
             colA, colB, colC = st.columns(3)
@@ -850,11 +800,89 @@ def dashboard_main_content():
                 st.markdown("</div>", unsafe_allow_html=True)
             
             st.subheader("Previous Trades")
-            st.dataframe(pd.DataFrame(st.session_state.trades_executed).iloc[::-1], width='stretch') # Changed to width='stretch'
+            trade_table(bot, "previous_trades")
         else:
             st.info("No previous simulated trading data available.")
     st.markdown("</div>", unsafe_allow_html=True) # End dashboard-section
 
+    if st.session_state.user_email.lower() in ADMIN_EMAILS:
+        telemetry_panel()
+
+
+def telemetry_panel():
+    """Admin-only view of the hot-path latency histograms and counters (trading/telemetry.py)."""
+    import pandas as pd
+    with st.expander("Performance Telemetry"):
+        telemetry.enabled = st.toggle("Record metrics", value=telemetry.enabled, key="telemetry_enabled")
+        rows = telemetry.snapshot()
+        if rows:
+            st.dataframe(pd.DataFrame(rows), width='stretch', hide_index=True)
+        else:
+            st.info("No measurements recorded yet.")
+        col1, col2 = st.columns(2)
+        col1.download_button("Download Prometheus metrics", telemetry.render_prometheus(),
+                             file_name="mbu_metrics.prom", mime="text/plain")
+        if col2.button("Reset Metrics", key="telemetry_reset"):
+            telemetry.reset()
+            st.rerun()
+        st.caption("Startup: first-use import and initialization cost per component in this process")
+        st.dataframe(pd.DataFrame(startup_report()), width='stretch', hide_index=True)
+
+
+@st.fragment(run_every=BOT_TICK_INTERVAL)
+@timed("dashboard_render_seconds", section="live")
+def live_dashboard(bot):
+    """Re-renders only this section on a timer; the worker ticks the bot independently of it."""
+    import pandas as pd
+    from trading.worker import get_worker
+    snap = _bot_snapshot(bot)
+    if not snap["running"]:
+        st.rerun() # Bot stopped (e.g. run duration ended): refresh the whole page
+
+    last_run = snap["last_run_time"]
+    st.write(f"Last updated: {last_run.strftime('%Y-%m-%d %H:%M:%S') if last_run else 'waiting for first tick...'}")
+    # Served from the shared market-data hub; rendering never triggers an exchange call
+    hub = get_worker().hub
+    quotes = [f"{symbol}: ${hub.get(symbol):,.2f}" for symbol in bot.symbols if hub.get(symbol)]
+    if quotes:
+        st.caption(" | ".join(quotes))
+    for _, message in snap["events"]:
+        st.caption(message)
+
+    current_metrics = snap["metrics"]
+    
+    colA, colB, colC, colD = st.columns(4)
+    with colA:
+        st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+        st.metric("Total P/L", f"${snap['total_profit']:.2f}")
+        st.markdown("</div>", unsafe_allow_html=True)
+    with colB:
+        st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+        st.metric("Sharpe Ratio", f"{current_metrics['Sharpe Ratio']:.2f}")
+        st.markdown("</div>", unsafe_allow_html=True)
+    with colC:
+        st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+        st.metric("Max Drawdown", f"{current_metrics['Max Drawdown']:.2%}")
+        st.markdown("</div>", unsafe_allow_html=True)
+    with colD:
+        st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+        st.metric("Win Ratio", f"{current_metrics['Win Ratio']:.2%}")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    st.markdown("---")
+    st.subheader("Open Positions")
+    if snap["open_positions"]:
+        st.dataframe(pd.DataFrame(snap["open_positions"]), width='stretch') # Changed to width='stretch'
+    else:
+        st.info("No open positions.")
+    
+    st.markdown("---")
+    st.subheader("Trades Executed")
+    if snap["trade_count"]:
+        trade_table(bot, "live_trades")
+    else:
+        st.info("No trades executed yet.")
+
 
 # --- Main App Logic ---
 st.set_page_config(
@@ -909,6 +937,8 @@ if st.session_state.authenticated and st.session_state.two_fa_passed:
         st.session_state.show_change_password = True
         st.rerun()
     if st.sidebar.button("Logout"):
+        from trading.worker import get_worker
+        get_worker().stop_bot(st.session_state.user_email) # Stop bot on logout
         st.session_state.authenticated = False
         st.session_state.two_fa_passed = False
         st.session_state.two_fa_code = None
@@ -916,5 +946,5 @@ if st.session_state.authenticated and st.session_state.two_fa_passed:
         st.session_state.login_error = ""
         st.session_state.show_auth_forms = False
         st.session_state.show_change_password = False
-        st.session_state.bot_running = False # Stop bot on logout
+        st.session_state.bot_running = False
         st.rerun()
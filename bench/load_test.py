@@ -0,0 +1,113 @@
+"""
+Drive many simulated users against the broker layer with no network.
+
+    python bench/load_test.py --users 2000 --duration 20 --latency 0.05 --rate-limit 50
+
+Every user ticks at --interval: it reads prices for its symbols through the broker
+and, with probability --order-prob, submits a market order through the OrderQueue.
+The exchange is brokers.sim_exchange, so latency, rate limits and error injection are
+all configurable; the report shows achieved throughput, latencies and what the
+exchange saw, which is where throughput ceilings show up.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brokers.ccxt_brokers import SimBroker  # noqa: E402
+from brokers.client_pool import ClientPool  # noqa: E402
+from brokers.order_queue import OrderQueue, TokenBucket  # noqa: E402
+from brokers.sim_exchange import DEFAULT_PRICES, sim_exchange  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between a user's ticks")
+    parser.add_argument("--order-prob", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean exchange latency, seconds")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--rate-limit", type=float, default=50.0, help="exchange requests/second (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--threads", type=int, default=64, help="client-side worker threads")
+    parser.add_argument("--order-concurrency", type=int, default=8)
+    parser.add_argument("--batched", action="store_true", help="use get_prices instead of one get_price per symbol")
+    args = parser.parse_args(argv)
+
+    Sim = sim_exchange("LoadSim", latency=args.latency, jitter=args.jitter,
+                       rate_limit_per_sec=args.rate_limit or None, error_rate=args.error_rate, seed=1)
+    pool = ClientPool()
+    broker = SimBroker(Sim, pool=pool)
+    bucket = TokenBucket(args.rate_limit * 0.9) if args.rate_limit else TokenBucket(1e9)
+    orders = OrderQueue(broker, max_concurrency=args.order_concurrency, bucket=bucket, backoff=0.05)
+
+    symbols = list(DEFAULT_PRICES)
+    rng = random.Random(7)
+    user_symbols = [rng.sample(symbols, 2) for _ in range(args.users)]
+
+    read_latencies, order_latencies = [], []
+    counters = {"reads": 0, "read_failures": 0, "orders_ok": 0, "orders_failed": 0}
+    lock = threading.Lock()
+
+    def on_order(submitted_at):
+        def done(result):
+            with lock:
+                order_latencies.append(time.perf_counter() - submitted_at)
+                counters["orders_ok" if result["ok"] else "orders_failed"] += 1
+        return done
+
+    def user_tick(i):
+        t0 = time.perf_counter()
+        mine = user_symbols[i]
+        if args.batched:
+            prices = broker.get_prices(mine)["prices"]
+        else:
+            prices = {s: broker.get_price(s) for s in mine}
+        elapsed = time.perf_counter() - t0
+        with lock:
+            read_latencies.append(elapsed)
+            counters["reads"] += 1
+            # get_price returns None on failure; get_prices leaves failed symbols out
+            counters["read_failures"] += sum(1 for p in prices.values() if p is None) + len(mine) - len(prices)
+        if rng.random() < args.order_prob:
+            orders.submit(mine[0], rng.choice(("buy", "sell")), 0.01, callback=on_order(time.perf_counter()))
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    ticks = 0
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        while time.perf_counter() < deadline:
+            round_start = time.perf_counter()
+            list(executor.map(user_tick, range(args.users)))
+            ticks += 1
+            lag = time.perf_counter() - round_start
+            if lag < args.interval:
+                time.sleep(args.interval - lag)
+    # Rates use the measured time: the last round can run well past the deadline
+    wall = time.perf_counter() - started
+    orders.shutdown(wait=True)
+
+    reads = np.array(read_latencies) * 1000
+    fills = np.array(order_latencies) * 1000
+    print(f"users={args.users} rounds={ticks} (target {int(args.duration / args.interval)}) in {wall:.2f}s")
+    print(f"price reads: {counters['reads']} ({counters['reads'] / wall:,.0f}/s), "
+          f"failures {counters['read_failures']}, p50 {np.percentile(reads, 50):.2f} ms, "
+          f"p99 {np.percentile(reads, 99):.2f} ms")
+    if len(fills):
+        print(f"orders: ok {counters['orders_ok']} failed {counters['orders_failed']}, "
+              f"p50 {np.percentile(fills, 50):.1f} ms, p99 {np.percentile(fills, 99):.1f} ms")
+    print(f"price cache: {broker.price_cache.stats} (hit ratio {broker.price_cache.hit_ratio:.1%})")
+    print(f"exchange saw: {Sim.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""
+Benchmarks for the trading hot paths.
+
+    python bench/run_benchmarks.py                  # run and print timings / peak memory
+    python bench/run_benchmarks.py --save-baseline  # record results in bench/baseline.json
+    python bench/run_benchmarks.py --compare        # flag regressions against the baseline
+
+Inputs are synthetic and seeded (random-walk prices, trade ledgers of 1k to 1M rows,
+a stub exchange with no network), so runs are comparable between commits on the
+same machine.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading.backtest import run_backtest  # noqa: E402
+from trading.bot import BotState, run_trading_bot_logic  # noqa: E402
+from trading.indicators import RollingStats, get_trading_signal  # noqa: E402
+from trading.metrics import TradeMetrics  # noqa: E402
+from trading.signal_matrix import SignalMatrix  # noqa: E402
+from trading.ledger import TradeLedger  # noqa: E402
+from trading.trade_table import TradeTable  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+SEED = 1234
+
+
+# --- synthetic data ----------------------------------------------------------
+def price_series(n, seed=SEED):
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+
+
+def trade_ledger(n, seed=SEED):
+    """Rows shaped like BotState.trades_executed."""
+    rng = np.random.default_rng(seed)
+    pnl = rng.normal(0.05, 1.0, n)
+    cum = np.cumsum(pnl)
+    start = datetime.datetime(2025, 1, 1)
+    symbols = ("BTC/USDT", "ETH/USDT", "SOL/USDT", "ADA/USDT")
+    return [{"Date": (start + datetime.timedelta(seconds=10 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+             "Symbol": symbols[i % 4], "Side": "BUY" if i % 2 else "SELL", "Quantity": 0.01,
+             "P/L": float(pnl[i]), "Cumulative P/L": float(cum[i]), "Reason": "Bot Close"}
+            for i in range(n)]
+
+
+class StubExchange:
+    """Just enough of a ccxt exchange for the broker layer: instant, deterministic tickers."""
+    has = {"fetchTickers": True}
+    rateLimit = 1
+    markets = None
+
+    def __init__(self, params=None):
+        self._rng = np.random.default_rng(SEED)
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+
+    def load_markets(self, reload=False):
+        self.markets = {}
+        return self.markets
+
+    def fetch_ticker(self, symbol):
+        return {"symbol": symbol, "last": float(self._rng.uniform(1, 100))}
+
+    def fetch_tickers(self, symbols=None):
+        return {s: self.fetch_ticker(s) for s in symbols or ()}
+
+
+# --- the old DataFrame-based paths, kept as reference points -------------------
+def metrics_dataframe(trades):
+    """calculate_metrics_demo as it was before the streaming accumulator."""
+    df = pd.DataFrame(trades)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Cumulative P/L'] = df['P/L'].cumsum()
+    returns = df['P/L']
+    sharpe_ratio = returns.mean() / returns.std() * np.sqrt(365) if returns.std() != 0 else 0
+    cumulative_returns = df['Cumulative P/L']
+    peak = cumulative_returns.expanding().max()
+    drawdown = (cumulative_returns - peak) / peak
+    max_drawdown = drawdown.min() if not drawdown.empty else 0
+    win_ratio = len(df[df['P/L'] > 0]) / len(df) if len(df) > 0 else 0
+    return {"Sharpe Ratio": sharpe_ratio, "Max Drawdown": max_drawdown, "Win Ratio": win_ratio}
+
+
+def history_pandas(prices, window=20):
+    """Per-tick pd.concat(...).tail(window) history the live loop used to keep."""
+    history = pd.Series([], dtype=float)
+    for p in prices:
+        history = pd.concat([history, pd.Series([p])]).tail(window)
+    return history
+
+
+# --- cases -------------------------------------------------------------------
+def case_signal_array(n):
+    prices = price_series(n)
+    window = 20
+    def run():
+        for t in range(window, n):
+            get_trading_signal("Mean Reversion", prices[t], prices[t - window:t])
+    return run
+
+
+def case_signal_rolling(n):
+    prices = price_series(n)
+    def run():
+        rs = RollingStats(20)
+        for p in prices:
+            rs.update("Mean Reversion", p)
+    return run
+
+
+def case_signal_matrix(n):
+    """n symbol-ticks as n // 500 batch ticks over 500 symbols."""
+    symbols = [f"SYM{i}/USDT" for i in range(500)]
+    ticks = price_series(max(n // 500, 1) * 500).reshape(-1, 500)
+    def run():
+        matrix = SignalMatrix(symbols, 20)
+        for prices in ticks:
+            matrix.update("Mean Reversion", prices)
+    return run
+
+
+def case_history_pandas(n):
+    prices = price_series(n)
+    return lambda: history_pandas(prices)
+
+
+def case_bot_tick(n):
+    """n ticks of run_trading_bot_logic over four symbols with a stubbed price feed."""
+    prices = price_series(n)
+    symbols = ["BTC/USDT", "ETH/USDT", "SOL/USDT", "ADA/USDT"]
+    def run():
+        state = BotState("bench", "Mean Reversion", 0.5, 1.0, symbols)
+        state.start()
+        for p in prices:
+            run_trading_bot_logic(state, lambda symbol: p)
+    return run
+
+
+def case_metrics_dataframe(n):
+    trades = trade_ledger(n)
+    return lambda: metrics_dataframe(trades)
+
+
+def case_metrics_streaming(n):
+    pnls = [t["P/L"] for t in trade_ledger(n)]
+    return lambda: TradeMetrics.from_pnls(pnls).snapshot()
+
+
+def case_dashboard_frame(n):
+    trades = trade_ledger(n)
+    return lambda: pd.DataFrame(trades).iloc[::-1]
+
+
+def case_trade_table_page(n):
+    """
+    A dashboard rerun after one more trade closed, on a SQLite ledger of n trades:
+    the symbol filter list, a filtered first page with its total, and the next page.
+    """
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    ledger = TradeLedger(path, flush_interval=3600)
+    trades = trade_ledger(n)
+    for trade in trades:
+        ledger.record_close("bench@example.com", trade)
+    ledger.flush()
+    table = TradeTable(ledger, "bench@example.com")
+    filters = {"symbols": ["BTC/USDT"], "sides": ["SELL"]}
+    table.symbols, table.page(0, **filters)  # first render: symbol list and total are loaded once
+    closed = [datetime.datetime(2026, 1, 1)]
+    def run():
+        closed[0] += datetime.timedelta(seconds=1)
+        ledger.record_close("bench@example.com", dict(trades[-1], Date=closed[0].strftime("%Y-%m-%d %H:%M:%S")))
+        ledger.flush()
+        table.symbols
+        table.page(0, **filters)
+        table.page(1, **filters)
+    return run
+
+
+def case_backtest(n):
+    prices = price_series(n)
+    return lambda: run_backtest(prices, "Mean Reversion", 0.5, 1.0)
+
+
+def case_broker_get_prices(n):
+    from brokers.ccxt_brokers import _BaseCCXT
+    from brokers.client_pool import ClientPool
+    broker = _BaseCCXT(StubExchange, pool=ClientPool())
+    symbols = [f"SYM{i}/USDT" for i in range(min(n, 5000))]
+    return lambda: broker.get_prices(symbols)
+
+
+# name -> (factory, largest size worth running; slow reference paths are capped)
+CASES = {
+    "get_trading_signal[array]": (case_signal_array, 100_000),
+    "RollingStats.update": (case_signal_rolling, 1_000_000),
+    "SignalMatrix.update[500 symbols]": (case_signal_matrix, 1_000_000),
+    "history[pd.concat]": (case_history_pandas, 10_000),
+    "run_trading_bot_logic": (case_bot_tick, 100_000),
+    "calculate_metrics[DataFrame]": (case_metrics_dataframe, 1_000_000),
+    "TradeMetrics.from_pnls": (case_metrics_streaming, 1_000_000),
+    "dashboard DataFrame": (case_dashboard_frame, 1_000_000),
+    "TradeTable rerun[ledger]": (case_trade_table_page, 1_000_000),
+    "run_backtest": (case_backtest, 1_000_000),
+    "broker.get_prices[stub]": (case_broker_get_prices, 1_000),
+}
+
+
+def measure(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def run(sizes, only=None, repeat=3):
+    results = {}
+    for name, (factory, max_size) in CASES.items():
+        if only and not any(o in name for o in only):
+            continue
+        for n in sizes:
+            if n > max_size:
+                continue
+            try:
+                fn = factory(n)
+            except ImportError as e:
+                print(f"{name:32s} {n:>9,d}  skipped ({e})")
+                break
+            seconds, peak = measure(fn, repeat if n < 1_000_000 else 1)
+            results[f"{name}@{n}"] = {"seconds": seconds, "peak_bytes": peak}
+            print(f"{name:32s} {n:>9,d}  {seconds * 1000:10.2f} ms  {peak / 2**20:9.2f} MiB peak")
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    regressions = 0
+    print(f"\nAgainst baseline {baseline.get('revision')} ({baseline.get('created')}):")
+    for key, now in results.items():
+        before = baseline["results"].get(key)
+        if not before:
+            continue
+        ratio = now["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        regressions += bool(flag)
+        print(f"{key:44s} {ratio:6.2f}x time  {now['peak_bytes'] / max(before['peak_bytes'], 1):6.2f}x memory{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--only", nargs="+", help="run cases whose name contains any of these")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.only, args.repeat)
+    if args.compare:
+        try:
+            with open(BASELINE_PATH) as f:
+                baseline = json.load(f)
+        except OSError:
+            print(f"No baseline at {BASELINE_PATH}; run with --save-baseline first.")
+            return 1
+        if compare(results, baseline, args.threshold):
+            return 1
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"revision": git_revision(), "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "machine": platform.machine(),
+                       "results": results}, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Cold-start import cost per component.
+
+Each component is imported in a fresh interpreter, so the numbers include everything
+it pulls in (as on a Render cold start) rather than whatever an earlier import
+already loaded. "landing page" is the set app.py imports before the first paint;
+the rest are loaded on first use.
+
+    python bench/startup_report.py [--repeat 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> import statements
+COMPONENTS = {
+    "landing page": "import streamlit, dotenv; import trading.db, trading.outbox, trading.telemetry",
+    "streamlit": "import streamlit",
+    "numpy": "import numpy",
+    "pandas": "import pandas",
+    "ccxt": "import ccxt",
+    "twilio": "import twilio.rest",
+    "smtplib + email": "import smtplib, ssl, email.mime.text",
+    "trading stack": "import trading.worker",
+    "trade table": "import trading.trade_table",
+}
+
+PROBE = """
+import time
+t0 = time.perf_counter()
+{stmt}
+print(time.perf_counter() - t0)
+"""
+
+
+def time_import(stmt):
+    proc = subprocess.run([sys.executable, "-c", PROBE.format(stmt=stmt)], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"
+    return float(proc.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per component (best is kept)")
+    args = parser.parse_args()
+
+    print(f"{'component':<20} {'import':>12}")
+    for name, stmt in COMPONENTS.items():
+        best, error = None, None
+        for _ in range(args.repeat):
+            elapsed, error = time_import(stmt)
+            if elapsed is None:
+                break
+            best = elapsed if best is None else min(best, elapsed)
+        if best is None:
+            print(f"{name:<20} {'n/a':>12}  ({error})")
+        else:
+            print(f"{name:<20} {best * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import ccxt
 
+from brokers.client_pool import default_pool
+from brokers.price_cache import shared_cache
+from trading.telemetry import inc, timer
+
+def _public_fetch_last(pool, exchange):
+    """Fetches through the pool's credential-less client, borrowed per call so LRU eviction still applies."""
+    params = {"enableRateLimit": True}
+
+    def fetch_last(symbol: str) -> float:
+        with timer("price_fetch_seconds", source="fetch_ticker"):
+            t = pool.get(exchange, params).fetch_ticker(symbol)
+        return float(t.get("last") or t.get("close") or 0.0)
+    return fetch_last
+
+
 class _BaseCCXT:
-    def __init__(self, exchange, key: str = "", secret: str = "", password: str = ""):
+    # Upper bound on parallel fetch_ticker calls when the exchange has no fetch_tickers
+    max_fetch_workers = 8
+
+    def __init__(self, exchange, key: str = "", secret: str = "", password: str = "", pool=None):
         params = {"apiKey": key or "", "secret": secret or "", "enableRateLimit": True}
         if password:
             params["password"] = password
-        self.ex = exchange(params)
+        # Clients (and their loaded markets) are shared per process; see brokers/client_pool.py
+        pool = pool or default_pool()
+        self.ex = pool.get(exchange, params)
+        # The cache outlives this broker, so it must not hold on to self.ex (a user's client)
+        self.price_cache = shared_cache(type(self.ex).__name__, _public_fetch_last(pool, exchange))
 
-    def get_price(self, symbol: str) -> float:
+    def get_price(self, symbol: str) -> float | None:
         """
         symbol format is usually 'BTC/USDT', 'ETH/USD', etc.
+        Served from the shared PriceCache; None if there is no fresh or stale price and
+        the fetch failed (see price_cache.stats["errors"]), never a made-up 0.0.
         """
-        try:
-            t = self.ex.fetch_ticker(symbol)
-            return float(t.get("last") or 0.0)
-        except Exception:
-            return 0.0
+        with timer("price_fetch_seconds", source="cache"):
+            return self.price_cache.get(symbol)
+
+    def get_prices(self, symbols):
+        """
+        Fetch last prices for many symbols in (ideally) one round trip.
 
-    def place_market_order(self, symbol: str, side: str, qty: float):
+        Uses fetch_tickers when the exchange supports it, otherwise fans out
+        fetch_ticker calls over a small thread pool. Returns
+        {"prices": {symbol: float}, "errors": {symbol: str}}; a symbol is in
+        exactly one of the two dicts.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        inc("price_symbols_requested_total", len(symbols))
+        prices, errors = {}, {}
+        if not symbols:
+            return {"prices": prices, "errors": errors}
+
+        if self.ex.has.get("fetchTickers"):
+            try:
+                with timer("price_fetch_seconds", source="fetch_tickers"):
+                    tickers = self.ex.fetch_tickers(symbols)
+            except Exception as e:
+                tickers = None
+                batch_error = str(e)
+            if tickers is not None:
+                for symbol in symbols:
+                    self._record_ticker(symbol, tickers.get(symbol), prices, errors)
+                return {"prices": prices, "errors": errors}
+            # Some exchanges advertise fetchTickers but reject symbol lists; fall through
+            if len(symbols) == 1:
+                errors[symbols[0]] = batch_error
+                return {"prices": prices, "errors": errors}
+
+        def fetch_one(symbol):
+            try:
+                with timer("price_fetch_seconds", source="fetch_ticker"):
+                    return symbol, self.ex.fetch_ticker(symbol), None
+            except Exception as e:
+                return symbol, None, str(e)
+
+        workers = min(self.max_fetch_workers, len(symbols))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for symbol, ticker, error in pool.map(fetch_one, symbols):
+                if error is not None:
+                    errors[symbol] = error
+                else:
+                    self._record_ticker(symbol, ticker, prices, errors)
+        return {"prices": prices, "errors": errors}
+
+    def _record_ticker(self, symbol, ticker, prices, errors):
+        if not ticker:
+            errors[symbol] = "symbol missing from ticker response"
+            return
+        last = ticker.get("last") or ticker.get("close")
+        if not last:
+            errors[symbol] = "ticker has no last price"
+            return
+        prices[symbol] = float(last)
+        self.price_cache.put(symbol, last)  # batched fetches keep get_price warm too
+
+    def create_market_order(self, symbol: str, side: str, qty: float, client_order_id: str = None):
+        """Raw order call; raises ccxt errors. ``client_order_id`` lets the exchange reject duplicates."""
+        params = {"clientOrderId": client_order_id} if client_order_id else {}
+        with timer("order_seconds", exchange=type(self.ex).__name__):
+            if side.lower() == "buy":
+                return self.ex.create_market_buy_order(symbol, qty, params)
+            return self.ex.create_market_sell_order(symbol, qty, params)
+
+    def place_market_order(self, symbol: str, side: str, qty: float, client_order_id: str = None):
         try:
-            side = side.lower()
-            if side == "buy":
-                o = self.ex.create_market_buy_order(symbol, qty)
-            else:
-                o = self.ex.create_market_sell_order(symbol, qty)
+            o = self.create_market_order(symbol, side, qty, client_order_id)
             return {"ok": True, "data": o}
         except Exception as e:
             return {"ok": False, "error": str(e)}
 
 class BinanceBroker(_BaseCCXT):
     name = "binance"
-    def __init__(self, key: str, secret: str):
-        super().__init__(ccxt.binance, key, secret)
+    def __init__(self, key: str, secret: str, pool=None):
+        super().__init__(ccxt.binance, key, secret, pool=pool)
+
+class SimBroker(_BaseCCXT):
+    """Broker over brokers.sim_exchange, for offline load tests."""
+    name = "sim"
+    def __init__(self, exchange=None, key: str = "", secret: str = "", pool=None):
+        from brokers.sim_exchange import SimExchange
+        super().__init__(exchange or SimExchange, key, secret, pool=pool)
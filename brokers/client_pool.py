@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Where loaded market metadata is cached between processes (gunicorn workers, restarts)
+MARKETS_CACHE_DIR = os.getenv("MARKETS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "mbu_markets"))
+MARKETS_CACHE_TTL = int(os.getenv("MARKETS_CACHE_TTL", 6 * 3600))  # seconds
+CLIENT_POOL_SIZE = int(os.getenv("CLIENT_POOL_SIZE", 64))
+CLIENT_IDLE_TTL = int(os.getenv("CLIENT_IDLE_TTL", 1800))  # seconds
+
+
+def _exchange_id(exchange) -> str:
+    return getattr(exchange, "__name__", None) or type(exchange).__name__
+
+
+def _credential_key(exchange, params: dict) -> tuple:
+    """Pool key; credentials are hashed so raw secrets never end up in the key."""
+    digest = hashlib.sha256()
+    for field in ("apiKey", "secret", "password"):
+        digest.update((params.get(field) or "").encode())
+        digest.update(b"\0")
+    return (_exchange_id(exchange), digest.hexdigest())
+
+
+class MarketCache:
+    """
+    Market metadata per exchange: loaded once per process, shared across every
+    client of that exchange and persisted to disk so other workers skip load_markets.
+    """
+
+    def __init__(self, cache_dir: str = MARKETS_CACHE_DIR, ttl: int = MARKETS_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._mem = {}  # exchange_id -> (loaded_at, markets, currencies)
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _path(self, exchange_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{exchange_id}.json")
+
+    def _lock_for(self, exchange_id: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(exchange_id, threading.Lock())
+
+    def _fresh(self, loaded_at: float) -> bool:
+        return time.time() - loaded_at < self.ttl
+
+    def _read_disk(self, exchange_id: str):
+        try:
+            with open(self._path(exchange_id), "r", encoding="utf-8") as f:
+                blob = json.load(f)
+            if self._fresh(blob["loaded_at"]):
+                return blob["loaded_at"], blob["markets"], blob.get("currencies")
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def _write_disk(self, exchange_id: str, entry) -> None:
+        loaded_at, markets, currencies = entry
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"loaded_at": loaded_at, "markets": markets, "currencies": currencies}, f)
+            os.replace(tmp, self._path(exchange_id))  # atomic, so readers never see half a file
+        except (OSError, TypeError, ValueError):
+            pass  # the cache is an optimisation; a failed write just means the next worker reloads
+
+    def cached(self, exchange_id: str):
+        """Fresh (loaded_at, markets, currencies) from memory or disk, or None; never hits the network."""
+        entry = self._mem.get(exchange_id)
+        if entry is None or not self._fresh(entry[0]):
+            entry = self._read_disk(exchange_id)
+            if entry is not None:
+                self._mem[exchange_id] = entry
+        return entry
+
+    def attach(self, ex, wait: bool = True) -> None:
+        """
+        Give ``ex`` cached markets, loading them from the exchange at most once per TTL.
+        With ``wait=False`` a load that needs the network runs in a background thread.
+        """
+        exchange_id = type(ex).__name__
+        entry = self.cached(exchange_id)
+        if entry is None:
+            if not wait:
+                threading.Thread(target=self._attach_quietly, args=(ex,), name="markets-load", daemon=True).start()
+                return
+            with self._lock_for(exchange_id):
+                entry = self.cached(exchange_id)
+                if entry is None:
+                    markets = ex.load_markets(reload=True)
+                    entry = (time.time(), markets, getattr(ex, "currencies", None))
+                    self._write_disk(exchange_id, entry)
+                    self._mem[exchange_id] = entry
+        _, markets, currencies = entry
+        if ex.markets is not markets:
+            ex.set_markets(markets, currencies)
+
+    def _attach_quietly(self, ex) -> None:
+        try:
+            self.attach(ex)
+        except Exception:
+            pass  # exchange unreachable; ccxt will lazily load markets on first call
+
+    def invalidate(self, exchange_id: str) -> None:
+        self._mem.pop(exchange_id, None)
+        try:
+            os.remove(self._path(exchange_id))
+        except OSError:
+            pass
+
+
+class ClientPool:
+    """
+    Process-wide LRU pool of ccxt clients keyed by exchange and credentials.
+    Clients idle for longer than ``idle_ttl`` or pushed out by ``max_size`` are dropped.
+    """
+
+    def __init__(self, max_size: int = CLIENT_POOL_SIZE, idle_ttl: int = CLIENT_IDLE_TTL,
+                 markets: MarketCache = None):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.markets = markets or MarketCache()
+        self._clients = OrderedDict()  # key -> [client, last_used]
+        self._lock = threading.Lock()
+
+    def get(self, exchange, params: dict, preload_markets: bool = True):
+        key = _credential_key(exchange, params)
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            slot = self._clients.get(key)
+            if slot is not None:
+                slot[1] = now
+                self._clients.move_to_end(key)
+                return slot[0]
+            client = exchange(dict(params))
+            self._clients[key] = [client, now]
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+        if preload_markets:
+            # Cached markets are attached now; a network load never blocks the caller
+            self.markets.attach(client, wait=False)
+        return client
+
+    def _evict_idle(self, now: float) -> None:
+        while self._clients:
+            key, (_, last_used) = next(iter(self._clients.items()))
+            if now - last_used <= self.idle_ttl:
+                break
+            del self._clients[key]
+
+    def __len__(self):
+        return len(self._clients)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool() -> ClientPool:
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = ClientPool()
+    return _default_pool
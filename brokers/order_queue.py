@@ -0,0 +1,142 @@
+"""
+Non-blocking order pipeline for the CCXT brokers.
+
+submit() returns at once with a Future; orders drain through a bounded worker pool,
+each waiting on the exchange's token bucket so bursts from many users go out at the
+rate the exchange allows. Every order carries a client-generated idempotency key
+that is sent as the exchange clientOrderId: resubmitting the same key (from a retry
+or a caller) never creates a second order.
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import ccxt
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the order may safely be retried with the same client order id
+RETRYABLE_ERRORS = (ccxt.NetworkError, ccxt.RateLimitExceeded, ccxt.ExchangeNotAvailable)
+
+
+def new_client_order_id(prefix: str = "mbu") -> str:
+    # Binance caps client order ids at 36 chars of [A-Za-z0-9_-]
+    return f"{prefix}-{uuid.uuid4().hex[:28]}"
+
+
+class TokenBucket:
+    """Classic token bucket; acquire() blocks the calling worker thread, never the submitter."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = float(rate)              # tokens per second
+        self.capacity = float(burst or max(1.0, rate))
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def exchange_bucket(broker) -> TokenBucket:
+    """One bucket per exchange per process, sized from ccxt's rateLimit (ms between requests)."""
+    name = type(broker.ex).__name__
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            rate_limit_ms = getattr(broker.ex, "rateLimit", None) or 100
+            bucket = _buckets[name] = TokenBucket(1000.0 / rate_limit_ms)
+        return bucket
+
+
+class OrderQueue:
+    def __init__(self, broker, max_concurrency: int = 4, bucket: TokenBucket = None,
+                 max_retries: int = 3, backoff: float = 0.5):
+        self.broker = broker
+        self.bucket = bucket or exchange_bucket(broker)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="orders")
+        self._orders = {}  # client_order_id -> Future
+        self._lock = threading.Lock()
+
+    def submit(self, symbol: str, side: str, qty: float, client_order_id: str = None, callback=None) -> Future:
+        """
+        Queue a market order and return its Future immediately. The Future resolves to
+        ``{"ok", "data"|"error", "client_order_id", "attempts"}``, the same shape as
+        place_market_order plus the key; ``callback(result)`` runs on completion.
+        Submitting a key that is already known returns the existing Future.
+        """
+        client_order_id = client_order_id or new_client_order_id()
+        with self._lock:
+            future = self._orders.get(client_order_id)
+            if future is None:
+                future = Future()
+                future.client_order_id = client_order_id
+                self._orders[client_order_id] = future
+                self._pool.submit(self._run, future, symbol, side, qty)
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(f.result()))
+        return future
+
+    def _run(self, future, symbol, side, qty):
+        key = future.client_order_id
+        attempt = 0
+        while True:
+            attempt += 1
+            self.bucket.acquire()
+            try:
+                order = self.broker.create_market_order(symbol, side, qty, client_order_id=key)
+                result = {"ok": True, "data": order}
+                break
+            except ccxt.InvalidOrder as e:
+                if attempt > 1 and "duplicate" in str(e).lower():
+                    # An earlier attempt reached the exchange before its response was lost
+                    result = {"ok": True, "data": None, "duplicate": True}
+                else:
+                    result = {"ok": False, "error": str(e)}
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt > self.max_retries:
+                    result = {"ok": False, "error": str(e)}
+                    break
+                delay = self.backoff * 2 ** (attempt - 1) * (1 + random.random())
+                logger.warning("order %s attempt %d failed (%s); retrying in %.2fs", key, attempt, e, delay)
+                time.sleep(delay)
+            except Exception as e:
+                result = {"ok": False, "error": str(e)}
+                break
+        result.update(client_order_id=key, attempts=attempt)
+        future.set_result(result)
+
+    def status(self, client_order_id: str):
+        future = self._orders.get(client_order_id)
+        if future is None:
+            return None
+        return future.result() if future.done() else {"pending": True, "client_order_id": client_order_id}
+
+    def forget(self, client_order_id: str):
+        """Drop a finished order's result once the caller has recorded it."""
+        with self._lock:
+            future = self._orders.get(client_order_id)
+            if future is not None and future.done():
+                del self._orders[client_order_id]
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,145 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", 2.0))     # seconds a price is served as fresh
+PRICE_CACHE_STALE = float(os.getenv("PRICE_CACHE_STALE", 30.0))  # extra seconds it may be served stale
+
+
+class PriceCache:
+    """
+    Symbol-keyed price cache with stale-while-revalidate.
+
+    - fresh (age < ttl): served from memory.
+    - stale (age < ttl + stale): served from memory while the single background
+      refresher fetches a new value.
+    - missing or expired: fetched inline; concurrent callers for the same symbol wait
+      on that one fetch (single flight) instead of each hitting the exchange.
+
+    ``fetch(symbol)`` must return a positive float or raise; failures never replace a
+    good cached value and are counted in ``stats``.
+    """
+
+    def __init__(self, fetch, ttl: float = PRICE_CACHE_TTL, stale: float = PRICE_CACHE_STALE):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale = stale
+        self._entries = {}      # symbol -> (price, fetched_at)
+        self._inflight = {}     # symbol -> threading.Event
+        self._lock = threading.Lock()
+        self._refresh_q = queue.Queue()
+        self._queued = set()
+        self._refresher = None
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+    def get(self, symbol: str):
+        """Cached price for ``symbol``, or None if there is no fresh or stale one and the fetch fails."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None:
+                age = now - entry[1]
+                if age < self.ttl:
+                    self.stats["hits"] += 1
+                    return entry[0]
+                if age < self.ttl + self.stale:
+                    self.stats["stale_hits"] += 1
+                    self._schedule_refresh(symbol)
+                    return entry[0]
+                # Expired: never served again, even if the fetch below fails
+                del self._entries[symbol]
+            self.stats["misses"] += 1
+            event = self._inflight.get(symbol)
+            leader = event is None
+            if leader:
+                event = self._inflight[symbol] = threading.Event()
+        if leader:
+            try:
+                self._load(symbol)
+            finally:
+                with self._lock:
+                    self._inflight.pop(symbol, None)
+                event.set()
+        else:
+            event.wait()
+        with self._lock:
+            entry = self._entries.get(symbol)
+        if entry is None or time.time() - entry[1] >= self.ttl + self.stale:
+            return None
+        return entry[0]
+
+    def put(self, symbol: str, price: float, fetched_at: float = None):
+        """Seed the cache, e.g. from a batched fetch_tickers response."""
+        if price:
+            with self._lock:
+                self._entries[symbol] = (float(price), fetched_at or time.time())
+
+    def invalidate(self, symbol: str = None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
+
+    def _load(self, symbol):
+        try:
+            price = float(self.fetch(symbol))
+            if not price > 0:
+                raise ValueError(f"invalid price {price!r}")
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            logger.warning("price fetch failed for %s: %s", symbol, e)
+            return
+        self.put(symbol, price)
+
+    def _schedule_refresh(self, symbol):
+        # Called with self._lock held
+        if symbol in self._queued or symbol in self._inflight:
+            return
+        self._queued.add(symbol)
+        self._refresh_q.put(symbol)
+        if self._refresher is None or not self._refresher.is_alive():
+            self._refresher = threading.Thread(target=self._run_refresher, name="price-cache-refresher", daemon=True)
+            self._refresher.start()
+
+    def _run_refresher(self):
+        while True:
+            symbol = self._refresh_q.get()
+            with self._lock:
+                self._queued.discard(symbol)
+                if symbol in self._inflight:
+                    continue
+                event = self._inflight[symbol] = threading.Event()
+                self.stats["refreshes"] += 1
+            try:
+                self._load(symbol)
+            finally:
+                with self._lock:
+                    self._inflight.pop(symbol, None)
+                event.set()
+
+    @property
+    def hit_ratio(self) -> float:
+        served = self.stats["hits"] + self.stats["stale_hits"]
+        total = served + self.stats["misses"]
+        return served / total if total else 0.0
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_cache(name: str, fetch, **kwargs) -> PriceCache:
+    """One cache per market-data source per process (prices are public, so not per credential)."""
+    cache = _shared.get(name)
+    if cache is None:
+        with _shared_lock:
+            cache = _shared.get(name)
+            if cache is None:
+                cache = _shared[name] = PriceCache(fetch, **kwargs)
+    return cache
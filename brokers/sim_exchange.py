@@ -0,0 +1,224 @@
+"""
+In-process exchange simulator for load-testing the broker layer offline.
+
+SimExchange implements the part of the ccxt interface _BaseCCXT and the order queue
+use (fetch_ticker, fetch_tickers, create_market_buy/sell_order, fetch_ohlcv,
+load_markets/set_markets, has, rateLimit) and raises real ccxt exception types, so
+retry and error handling paths behave as they would against a live exchange.
+
+    Sim = sim_exchange(latency=0.05, rate_limit_per_sec=20, error_rate=0.01)
+    broker = SimBroker(Sim)   # or _BaseCCXT(Sim, ...)
+"""
+import datetime
+import itertools
+import math
+import random
+import threading
+import time
+
+import ccxt
+
+DEFAULT_PRICES = {"BTC/USDT": 27500.0, "ETH/USDT": 1750.0, "SOL/USDT": 125.0, "ADA/USDT": 0.4}
+TIMEFRAME_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400}
+_ERRORS = (ccxt.NetworkError, ccxt.RequestTimeout, ccxt.ExchangeNotAvailable)
+
+
+class SimExchange:
+    # Class-level config; sim_exchange() makes a configured subclass
+    latency = 0.0            # mean seconds per request
+    jitter = 0.0             # +/- uniform seconds around the mean
+    rate_limit_per_sec = None  # requests/second across all clients of this class; None = unlimited
+    rate_limit_burst = None
+    error_rate = 0.0         # probability a request raises a transient ccxt error
+    volatility = 0.8         # annualised, for the geometric Brownian motion price process
+    drift = 0.0
+    slippage_bps = 2.0
+    initial_prices = DEFAULT_PRICES
+    seed = None
+
+    has = {"fetchTicker": True, "fetchTickers": True, "fetchOHLCV": True, "createMarketOrder": True}
+    rateLimit = 50  # ms, what ccxt would advertise; read by the order queue's token bucket
+
+    # Shared "venue" state for every client of the class (i.e. every API key)
+    _lock = None
+    _prices = None
+    _stamp = None
+    _rng = None
+    _bucket = None
+    _orders = None
+    _order_ids = None
+    stats = None
+
+    def __init__(self, params=None):
+        self.params = dict(params or {})
+        self.markets = None
+        self.currencies = None
+        cls = type(self)
+        with _init_lock:
+            if cls._lock is None:
+                cls._reset_venue()
+
+    @classmethod
+    def _reset_venue(cls):
+        cls._lock = threading.Lock()
+        cls._rng = random.Random(cls.seed)
+        cls._prices = dict(cls.initial_prices)
+        cls._stamp = time.monotonic()
+        cls._bucket = [cls.rate_limit_burst or cls.rate_limit_per_sec or 0, time.monotonic()]
+        cls._orders = {}   # clientOrderId -> order
+        cls._order_ids = itertools.count(1)
+        cls.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "orders": 0, "duplicates": 0}
+
+    # --- request plumbing -------------------------------------------------
+    def _request(self):
+        cls = type(self)
+        with cls._lock:
+            cls.stats["requests"] += 1
+            if cls.rate_limit_per_sec:
+                tokens, stamp = cls._bucket
+                now = time.monotonic()
+                capacity = cls.rate_limit_burst or cls.rate_limit_per_sec
+                tokens = min(capacity, tokens + (now - stamp) * cls.rate_limit_per_sec)
+                if tokens < 1:
+                    cls._bucket = [tokens, now]
+                    cls.stats["rate_limited"] += 1
+                    raise ccxt.RateLimitExceeded("sim: rate limit exceeded")
+                cls._bucket = [tokens - 1, now]
+            fail = cls.error_rate and cls._rng.random() < cls.error_rate
+            delay = max(0.0, cls.latency + cls._rng.uniform(-cls.jitter, cls.jitter)) if (cls.latency or cls.jitter) else 0.0
+            if fail:
+                cls.stats["errors"] += 1
+                error = cls._rng.choice(_ERRORS)
+        if delay:
+            time.sleep(delay)  # outside the lock, so concurrent requests overlap like real I/O
+        if fail:
+            raise error("sim: injected failure")
+
+    def _advance(self):
+        """Move every price along its GBM path by the wall time elapsed since the last call."""
+        cls = type(self)
+        now = time.monotonic()
+        dt = (now - cls._stamp) / (365 * 86400)
+        if dt <= 0:
+            return
+        cls._stamp = now
+        sigma = cls.volatility
+        for symbol, price in cls._prices.items():
+            shock = cls._rng.gauss(0.0, 1.0)
+            cls._prices[symbol] = price * math.exp((cls.drift - 0.5 * sigma * sigma) * dt + sigma * math.sqrt(dt) * shock)
+
+    def _price(self, symbol):
+        cls = type(self)
+        if symbol not in cls._prices:
+            raise ccxt.BadSymbol(f"sim: unknown symbol {symbol}")
+        return cls._prices[symbol]
+
+    # --- markets ----------------------------------------------------------
+    def load_markets(self, reload=False, params=None):
+        if self.markets and not reload:
+            return self.markets
+        self._request()
+        self.markets = {}
+        for symbol in type(self)._prices:
+            base, quote = symbol.split("/")
+            self.markets[symbol] = {"id": base + quote, "symbol": symbol, "base": base, "quote": quote,
+                                    "active": True, "type": "spot", "spot": True}
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+        self.currencies = currencies
+        return markets
+
+    # --- market data ------------------------------------------------------
+    def _ticker(self, symbol, ts):
+        last = self._price(symbol)
+        spread = last * 0.0001
+        return {"symbol": symbol, "timestamp": ts, "datetime": _iso(ts), "last": last, "close": last,
+                "bid": last - spread, "ask": last + spread}
+
+    def fetch_ticker(self, symbol, params=None):
+        self._request()
+        with type(self)._lock:
+            self._advance()
+            return self._ticker(symbol, _now_ms())
+
+    def fetch_tickers(self, symbols=None, params=None):
+        self._request()
+        with type(self)._lock:
+            self._advance()
+            ts = _now_ms()
+            symbols = symbols or list(type(self)._prices)
+            return {s: self._ticker(s, ts) for s in symbols if s in type(self)._prices}
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=100, params=None):
+        """Synthetic bars ending at the current price (a fresh random walk per call)."""
+        self._request()
+        span = TIMEFRAME_SECONDS[timeframe]
+        with type(self)._lock:
+            self._advance()
+            close = self._price(symbol)
+            rng = random.Random(type(self)._rng.random())
+        end = (_now_ms() // (span * 1000)) * span * 1000
+        limit = limit or 100
+        start = since if since is not None else end - (limit - 1) * span * 1000
+        count = max(0, min(limit, (end - start) // (span * 1000) + 1))
+        step = self.volatility * math.sqrt(span / (365 * 86400))
+        rows = []
+        for i in range(count):
+            # Walk backwards from the current price, then reverse
+            open_ = close * math.exp(-rng.gauss(0, step))
+            high = max(open_, close) * (1 + abs(rng.gauss(0, step / 4)))
+            low = min(open_, close) * (1 - abs(rng.gauss(0, step / 4)))
+            rows.append([end - i * span * 1000, open_, high, low, close, rng.uniform(1, 100)])
+            close = open_
+        rows.reverse()
+        return rows
+
+    # --- orders -----------------------------------------------------------
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self._market_order(symbol, "buy", amount, params or {})
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self._market_order(symbol, "sell", amount, params or {})
+
+    def _market_order(self, symbol, side, amount, params):
+        self._request()
+        cls = type(self)
+        client_id = params.get("clientOrderId")
+        with cls._lock:
+            if client_id and client_id in cls._orders:
+                cls.stats["duplicates"] += 1
+                raise ccxt.InvalidOrder("sim: Duplicate order sent.")
+            self._advance()
+            price = self._price(symbol)
+            slip = price * cls.slippage_bps / 10_000
+            fill = price + slip if side == "buy" else price - slip
+            ts = _now_ms()
+            order = {"id": str(next(cls._order_ids)), "clientOrderId": client_id, "symbol": symbol,
+                     "type": "market", "side": side, "amount": amount, "filled": amount, "remaining": 0.0,
+                     "price": fill, "average": fill, "cost": fill * amount, "status": "closed",
+                     "timestamp": ts, "datetime": _iso(ts)}
+            cls.stats["orders"] += 1
+            if client_id:
+                cls._orders[client_id] = order
+        return order
+
+
+_init_lock = threading.Lock()
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _iso(ts):
+    return datetime.datetime.fromtimestamp(ts / 1000, datetime.timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def sim_exchange(name="SimExchange", **config):
+    """A SimExchange subclass with its own venue state and the given class-level settings."""
+    unknown = [k for k in config if not hasattr(SimExchange, k)]
+    if unknown:
+        raise TypeError(f"unknown sim_exchange options: {', '.join(unknown)}")
+    return type(name, (SimExchange,), dict(config))
@@ -0,0 +1,59 @@
+import os
+
+from trading.coordination import Coordinator
+from trading.ledger import TradeLedger
+from trading.worker import TradingWorker
+
+
+class Hub:
+    def subscribe(self, *args):
+        pass
+
+    def prices(self, symbols, max_age=None):
+        return {symbol: 100.0 for symbol in symbols}
+
+
+def make_worker(tmp_path, name):
+    db = str(tmp_path / "coord.db")
+    coordinator = Coordinator(db, lock_dir=str(tmp_path / "locks"), lease_ttl=5, worker_id=name)
+    worker = TradingWorker(interval=1, hub=Hub(), ledger=TradeLedger(db), coordinator=coordinator,
+                           send_order=lambda symbol, side, qty: {"price": 100.0})
+    worker.ensure_running = lambda: None  # the tests drive tick() themselves
+    return worker
+
+
+def test_failover_picks_up_running_bots(tmp_path):
+    a = make_worker(tmp_path, "a")
+    users = [f"u{i}@x.com" for i in range(20)]
+    for user in users:
+        a.start_bot(user, "Momentum", 1, 1, ["BTC/USDT"])
+    a.tick()
+    a.ledger.flush()
+
+    b = make_worker(tmp_path, "b")
+    for _ in range(2):
+        b.tick()
+        a.tick()
+    held_a, held_b = a.coordinator.held(), b.coordinator.held()
+    assert held_a | held_b == set(users)
+    assert not held_a & held_b
+    assert {s.user for s in a.running_bots()} == held_a
+    assert {s.user for s in b.running_bots()} == held_b
+
+    # a dies without shutting down: its flock goes away with the process
+    a.ledger.flush()
+    os.close(a.coordinator._lock_fd)
+    b.tick()
+    assert b.coordinator.held() == set(users)
+    assert {s.user for s in b.running_bots()} == set(users)
+
+
+def test_fresh_worker_resumes_running_bot(tmp_path):
+    a = make_worker(tmp_path, "a")
+    a.start_bot("u@x.com", "Momentum", 1, 1, ["BTC/USDT"])
+    a.shutdown()
+
+    b = make_worker(tmp_path, "b")
+    b.resume()
+    b.tick()
+    assert [s.user for s in b.running_bots()] == ["u@x.com"]
@@ -0,0 +1,186 @@
+"""
+Vectorized backtester for the built-in strategies.
+
+Entries reproduce get_trading_signal (each tick is compared with the window of ticks
+before it) and exits reproduce run_trading_bot_logic: a position is closed on the
+first later tick whose profit reaches ``min_profit`` % or whose loss reaches
+``max_loss`` %, and no new position is opened on the tick a position closes.
+Signals and exit searches are NumPy array passes; Python only loops once per trade.
+"""
+import numpy as np
+
+from trading.indicators import (
+    MOMENTUM_MIN_HISTORY, MOMENTUM_UP, MOMENTUM_DOWN,
+    BREAKOUT_MIN_HISTORY, BREAKOUT_UP, BREAKOUT_DOWN,
+    MEAN_REVERSION_MIN_HISTORY, MEAN_REVERSION_LOW, MEAN_REVERSION_HIGH,
+)
+
+BUY, HOLD, SELL = 1, 0, -1
+SIDE_NAMES = {BUY: "BUY", SELL: "SELL"}
+OHLCV_CLOSE = 4  # column of the close in ccxt fetch_ohlcv rows: [ts, open, high, low, close, volume]
+
+
+def as_prices(data) -> np.ndarray:
+    """Accept a 1-D tick array or 2-D OHLCV rows and return the float64 price series."""
+    arr = np.asarray(data, dtype=np.float64)
+    if arr.ndim == 2:
+        arr = arr[:, OHLCV_CLOSE]
+    if arr.ndim != 1:
+        raise ValueError("expected a 1-D price array or 2-D OHLCV rows")
+    return np.ascontiguousarray(arr)
+
+
+def _rolling_extreme(a: np.ndarray, w: int, op) -> np.ndarray:
+    """van Herk/Gil-Werman sliding max/min: out[k] = op over a[k:k+w], in O(len(a))."""
+    m = len(a)
+    nb = -(-m // w)
+    blocks = np.full(nb * w, -np.inf if op is np.maximum else np.inf)
+    blocks[:m] = a
+    blocks = blocks.reshape(nb, w)
+    prefix = op.accumulate(blocks, axis=1).ravel()
+    suffix = op.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return op(suffix[:m - w + 1], prefix[w - 1:m])
+
+
+def prior_window_stats(prices: np.ndarray, window: int):
+    """
+    For each tick t, stats over prices[max(0, t - window):t] (the history before t).
+    Returns (count, last, high, low, mean); entries with count == 0 are undefined.
+    """
+    n = len(prices)
+    t = np.arange(n)
+    count = np.minimum(t, window)
+
+    last = np.empty(n)
+    last[0] = np.nan
+    last[1:] = prices[:-1]
+
+    padded = np.concatenate([np.full(window, np.nan), prices])
+    hi_src = np.where(np.isnan(padded), -np.inf, padded)
+    lo_src = np.where(np.isnan(padded), np.inf, padded)
+    high = _rolling_extreme(hi_src, window, np.maximum)[:n]
+    low = _rolling_extreme(lo_src, window, np.minimum)[:n]
+
+    csum = np.concatenate([[0.0], np.cumsum(prices)])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (csum[t] - csum[t - count]) / count
+    return count, last, high, low, mean
+
+
+def strategy_signals(strategy_name: str, prices, window: int = 20) -> np.ndarray:
+    """BUY/SELL/HOLD (+1/-1/0) for every tick, matching get_trading_signal."""
+    prices = as_prices(prices)
+    count, last, high, low, mean = prior_window_stats(prices, window)
+    sig = np.zeros(len(prices), dtype=np.int8)
+    with np.errstate(invalid="ignore"):
+        if strategy_name == "Momentum":
+            ok = count > MOMENTUM_MIN_HISTORY
+            buy = ok & (prices > last * MOMENTUM_UP)
+            sell = ok & ~buy & (prices < last * MOMENTUM_DOWN)
+        elif strategy_name == "Breakout":
+            ok = count > BREAKOUT_MIN_HISTORY
+            buy = ok & (prices > high * BREAKOUT_UP)
+            sell = ok & ~buy & (prices < low * BREAKOUT_DOWN)
+        elif strategy_name == "Mean Reversion":
+            ok = count > MEAN_REVERSION_MIN_HISTORY
+            buy = ok & (prices < mean * MEAN_REVERSION_LOW)
+            sell = ok & ~buy & (prices > mean * MEAN_REVERSION_HIGH)
+        else:
+            return sig
+    sig[buy] = BUY
+    sig[sell] = SELL
+    return sig
+
+
+def _find_exit(prices, start, entry_price, side, min_profit, max_loss, chunk=64):
+    """First index >= start where the position hits min_profit/max_loss, or -1."""
+    n = len(prices)
+    while start < n:
+        end = min(n, start + chunk)
+        seg = prices[start:end]
+        if side == BUY:
+            profit_pct = (seg - entry_price) / entry_price * 100
+        else:
+            profit_pct = (entry_price - seg) / entry_price * 100
+        hit = (profit_pct >= min_profit) | (profit_pct <= -max_loss)
+        if hit.any():
+            return start + int(np.argmax(hit))
+        start = end
+        chunk *= 2  # positions that linger scan geometrically bigger slices
+    return -1
+
+
+def run_backtest(data, strategy_name: str, min_profit: float = 0.5, max_loss: float = 1.0,
+                 window: int = 20, quantity: float = 0.01, signals=None):
+    """
+    Backtest one strategy over a tick array or OHLCV rows.
+
+    Returns {"trades": columnar dict of NumPy arrays, "open_position": dict or None,
+    "metrics": summarize(pnl)}. Pass precomputed ``signals`` to reuse them across
+    parameter sets.
+    """
+    prices = as_prices(data)
+    if signals is None:
+        signals = strategy_signals(strategy_name, prices, window)
+    entries = np.flatnonzero(signals)
+
+    entry_idx, exit_idx, sides = [], [], []
+    i = 0
+    while i < len(entries):
+        e = int(entries[i])
+        side = int(signals[e])
+        x = _find_exit(prices, e + 1, prices[e], side, min_profit, max_loss)
+        entry_idx.append(e)
+        sides.append(side)
+        if x < 0:
+            exit_idx.append(-1)
+            break
+        exit_idx.append(x)
+        # The closing tick cannot open a new position
+        i = int(np.searchsorted(entries, x, side="right"))
+
+    open_position = None
+    if exit_idx and exit_idx[-1] < 0:
+        open_position = {"index": entry_idx.pop(), "side": SIDE_NAMES[sides.pop()]}
+        exit_idx.pop()
+        open_position["entry_price"] = float(prices[open_position["index"]])
+
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    exit_idx = np.asarray(exit_idx, dtype=np.int64)
+    side_arr = np.asarray(sides, dtype=np.int8)
+    entry_price = prices[entry_idx]
+    exit_price = prices[exit_idx]
+    pnl = (exit_price - entry_price) * side_arr * quantity
+    trades = {
+        "entry_index": entry_idx,
+        "exit_index": exit_idx,
+        "side": side_arr,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "pnl": pnl,
+        "pnl_pct": (exit_price - entry_price) * side_arr / entry_price * 100,
+    }
+    return {"trades": trades, "open_position": open_position, "metrics": summarize(pnl)}
+
+
+def summarize(pnl) -> dict:
+    """Same metrics as calculate_metrics_demo, computed on an array of closed-trade P/L."""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    n = len(pnl)
+    if not n:
+        return {"Sharpe Ratio": 0, "Max Drawdown": 0, "Win Ratio": 0, "Trades": 0, "Total P/L": 0.0}
+    std = pnl.std(ddof=1) if n > 1 else np.nan
+    sharpe = pnl.mean() / std * np.sqrt(365) if std and not np.isnan(std) else 0
+    cum = np.cumsum(pnl)
+    peak = np.maximum.accumulate(cum)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = (cum - peak) / peak
+    drawdown = drawdown[~np.isnan(drawdown)]
+    max_drawdown = float(drawdown.min()) if len(drawdown) else 0
+    return {
+        "Sharpe Ratio": float(sharpe),
+        "Max Drawdown": max_drawdown,
+        "Win Ratio": float((pnl > 0).sum() / n),
+        "Trades": n,
+        "Total P/L": float(cum[-1]),
+    }
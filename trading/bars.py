@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+
+TIMEFRAMES = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}  # seconds per bar
+BAR_FIELDS = ("ts", "open", "high", "low", "close", "volume")  # ts = bar open, epoch ms
+_TS, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME = range(6)
+
+
+class _BarRing:
+    """Closed bars in a mirrored ring (like PriceHistory) so the latest n are one contiguous view."""
+
+    __slots__ = ("capacity", "buf", "head", "size", "total")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buf = np.zeros((2 * capacity, len(BAR_FIELDS)), dtype=np.float64)
+        self.head = 0
+        self.size = 0
+        self.total = 0  # bars ever closed; lets readers detect new closes
+
+    def push(self, row):
+        self.buf[self.head] = row
+        self.buf[self.head + self.capacity] = row
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.total += 1
+
+    def view(self, n=None):
+        n = self.size if n is None else min(int(n), self.size)
+        end = self.head + self.capacity
+        v = self.buf[end - n:end]
+        v.flags.writeable = False
+        return v
+
+
+class BarAggregator:
+    """
+    Streaming OHLCV bars for one symbol across several timeframes, O(1) per tick.
+
+    Bars are aligned to the epoch (a 5m bar covers [12:05, 12:10)). A bar closes when
+    the first tick of a later bar arrives; intervals with no ticks produce no bar.
+    """
+
+    def __init__(self, timeframes=tuple(TIMEFRAMES), max_bars: int = 500):
+        self.timeframes = tuple(timeframes)
+        self._ms = {tf: TIMEFRAMES[tf] * 1000 for tf in self.timeframes}
+        self._rings = {tf: _BarRing(max_bars) for tf in self.timeframes}
+        self._current = {tf: None for tf in self.timeframes}  # open bar as a list, or None
+
+    def update(self, price: float, volume: float = 0.0, ts_ms: int = None):
+        """Fold one tick into every timeframe (``ts_ms`` defaults to now). Returns the timeframes that closed a bar."""
+        ts_ms = int(time.time() * 1000) if ts_ms is None else int(ts_ms)
+        closed = []
+        for tf in self.timeframes:
+            span = self._ms[tf]
+            bar = self._current[tf]
+            bucket = (ts_ms // span) * span
+            if bar is None or bucket > bar[_TS]:
+                if bar is not None:
+                    self._rings[tf].push(bar)
+                    closed.append(tf)
+                self._current[tf] = [bucket, price, price, price, price, volume]
+            else:
+                # Same bar (late ticks from an earlier bucket are folded into the open bar too)
+                if price > bar[_HIGH]:
+                    bar[_HIGH] = price
+                if price < bar[_LOW]:
+                    bar[_LOW] = price
+                bar[_CLOSE] = price
+                bar[_VOLUME] += volume
+        return closed
+
+    def closed_count(self, tf: str) -> int:
+        return self._rings[tf].total
+
+    def bars(self, tf: str, n: int = None, include_open: bool = False) -> dict:
+        """Latest ``n`` closed bars as zero-copy column views (optionally plus the open bar, copied)."""
+        rows = self._rings[tf].view(n)
+        if include_open and self._current[tf] is not None:
+            rows = np.vstack([rows, self._current[tf]])
+        return {name: rows[:, i] for i, name in enumerate(BAR_FIELDS)}
+
+    def closes(self, tf: str, n: int = None) -> np.ndarray:
+        return self._rings[tf].view(n)[:, _CLOSE]
+
+    def current(self, tf: str):
+        bar = self._current[tf]
+        return dict(zip(BAR_FIELDS, bar)) if bar is not None else None
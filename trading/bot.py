@@ -0,0 +1,367 @@
+import collections
+import datetime
+import os
+import random
+import threading
+
+import numpy as np
+
+from brokers.price_cache import PriceCache
+from trading.indicators import RollingStats
+from trading.metrics import TradeMetrics
+from trading.signal_matrix import SIGNAL_NAMES, SignalMatrix
+from trading.telemetry import timer
+
+DEFAULT_QUANTITY = 0.01  # Example small quantity for demo trades
+RECENT_TRADES_LIMIT = 1000  # trades kept in memory with a ledger attached (the dashboard pages the ledger)
+# Tick-mode bots trading at least this many symbols evaluate signals in one SignalMatrix pass
+BATCH_SIGNAL_MIN_SYMBOLS = int(os.getenv("BATCH_SIGNAL_MIN_SYMBOLS", 32))
+RUN_DURATIONS = {
+    "Continuous": None,
+    "1 hour": datetime.timedelta(hours=1),
+    "1 day": datetime.timedelta(days=1),
+}
+
+
+def _simulated_price(symbol):
+    # Dummy function for now, to simulate price fluctuations
+    # More realistic: fetch from a real exchange API (e.g., CCXT)
+    prices = {
+        "BTC/USDT": random.uniform(25000, 30000),
+        "ETH/USDT": random.uniform(1500, 2000),
+        "SOL/USDT": random.uniform(100, 150),
+        "ADA/USDT": random.uniform(0.3, 0.5),
+    }
+    return prices.get(symbol, random.uniform(1, 10))
+
+
+_live_prices = PriceCache(_simulated_price)
+
+
+def get_live_price(symbol):
+    """Latest demo price for ``symbol`` from the TTL cache (None if it could not be fetched)."""
+    return _live_prices.get(symbol)
+
+
+class BotState:
+    """
+    Everything one user's bot owns: settings, positions, the trade ledger, per-symbol
+    price windows and a short log of activity for the dashboard.
+
+    The background worker mutates it on each tick and the Streamlit page only reads
+    it, so both sides hold ``lock`` while touching it. With a ``ledger`` attached,
+    every change is also queued for the SQLite ledger so the bot survives restarts.
+    """
+
+    def __init__(self, user, strategy="Momentum", min_profit=0.5, max_loss=1.0, symbols=(),
+                 timeframe="Continuous", window=20, quantity=DEFAULT_QUANTITY, ledger=None,
+                 signal_timeframe=None):
+        self.user = user
+        self.ledger = None  # attached after configure() so construction does not write
+        self.outbox = None  # trading.outbox.Outbox for batched trade-alert emails, attached by the worker
+        self.lock = threading.RLock()
+        self.window = window
+        self.quantity = quantity
+        self.running = False
+        self.start_time = None
+        self.end_time = None
+        self.last_run_time = None
+        self.open_positions = {}
+        self.trades_executed = []
+        self.total_profit = 0.0
+        self.trade_metrics = TradeMetrics()
+        self.histories = {}
+        self.signal_matrix = None  # batch-mode windows, see signal_matrix_for()
+        self.events = collections.deque(maxlen=50)
+        self.bars_seen = {}  # (symbol, bar timeframe) -> closed bars already fed to the history
+        self.configure(strategy, min_profit, max_loss, symbols, timeframe, signal_timeframe)
+        self.ledger = ledger
+
+    def restore(self):
+        """Reload the last saved session, open positions and recent trades from the ledger."""
+        if self.ledger is None:
+            return False
+        saved = self.ledger.load_session(self.user)
+        if saved is None:
+            return False
+        with self.lock:
+            self.start_time = saved["started_at"]
+            self.strategy = saved["strategy"]
+            self.min_profit = saved["min_profit"]
+            self.max_loss = saved["max_loss"]
+            self.symbols = saved["symbols"]
+            self.timeframe = saved["timeframe"]
+            self.signal_timeframe = saved.get("signal_timeframe")
+            duration = RUN_DURATIONS.get(self.timeframe)
+            self.end_time = self.start_time + duration if (duration and self.start_time) else None
+            self.running = saved["running"]
+            self.total_profit = saved["total_profit"]
+            self.trade_metrics = TradeMetrics.from_json(saved["metrics"]) if saved["metrics"] else TradeMetrics()
+            self.open_positions = self.ledger.open_positions(self.user)
+            recent = self.ledger.trades(self.user, start=self.start_time, limit=RECENT_TRADES_LIMIT, newest_first=True)
+            self.trades_executed = recent[::-1]
+        return True
+
+    def save(self):
+        if self.ledger is not None:
+            self.ledger.save_session(self)
+
+    def configure(self, strategy, min_profit, max_loss, symbols, timeframe="Continuous", signal_timeframe=None):
+        """``signal_timeframe`` ("1m", "5m", ...) evaluates entries on bar closes; None means every tick."""
+        with self.lock:
+            if signal_timeframe != getattr(self, "signal_timeframe", None):
+                # Tick and bar histories are not comparable; rebuild from the new source
+                self.histories = {}
+                self.signal_matrix = None
+                self.bars_seen = {}
+            self.signal_timeframe = signal_timeframe
+            self.strategy = strategy
+            self.min_profit = min_profit
+            self.max_loss = max_loss
+            self.symbols = list(symbols)
+            self.timeframe = timeframe
+            duration = RUN_DURATIONS.get(timeframe)
+            self.end_time = self.start_time + duration if (duration and self.start_time) else None
+            self.save()
+
+    def start(self):
+        with self.lock:
+            # Fresh demo each start
+            self.open_positions = {}
+            self.trades_executed = []
+            self.total_profit = 0.0
+            self.trade_metrics = TradeMetrics()
+            self.start_time = datetime.datetime.now()
+            self.last_run_time = None
+            self.running = True
+            if self.ledger is not None:
+                self.ledger.reset_user(self.user)
+            self.configure(self.strategy, self.min_profit, self.max_loss, self.symbols, self.timeframe,
+                           self.signal_timeframe)
+
+    def stop(self, reason=None):
+        with self.lock:
+            self.running = False
+            if reason:
+                self.log(reason)
+            self.save()
+
+    def log(self, message):
+        self.events.append((datetime.datetime.now(), message))
+
+    def history_for(self, symbol) -> RollingStats:
+        history = self.histories.get(symbol)
+        if history is None or history.window != self.window:
+            history = self.histories[symbol] = RollingStats(self.window)
+        return history
+
+    def signal_matrix_for(self) -> SignalMatrix:
+        """The batch-mode matrix over the current symbols, keeping windows already collected."""
+        matrix = self.signal_matrix
+        if matrix is None:
+            matrix = SignalMatrix(self.symbols, self.window)
+            for symbol, history in self.histories.items():
+                if symbol in matrix.index:
+                    matrix.seed(symbol, history.view())
+        elif matrix.symbols != self.symbols or matrix.window != self.window:
+            matrix = matrix.reindex(self.symbols, self.window)
+        self.signal_matrix = matrix
+        return matrix
+
+    def leave_batch_mode(self):
+        """Back to per-symbol windows: rebuild them from the matrix, which is all that was updated in batch mode."""
+        matrix, self.signal_matrix = self.signal_matrix, None
+        self.histories = {}
+        for symbol in matrix.symbols:
+            history = self.history_for(symbol)
+            for price in matrix.window_of(symbol):
+                history.push(float(price))
+
+    def metrics(self) -> dict:
+        """Same keys as the dashboard metric cards; O(1) from the streaming accumulator."""
+        with self.lock:
+            return self.trade_metrics.snapshot()
+
+
+def execute_trade_demo(state, symbol, side, quantity, price):
+    """Simulates executing a trade and records it on the bot state."""
+    trade_info = {
+        "Date": datetime.datetime.now(),
+        "Symbol": symbol,
+        "Side": side,
+        "Quantity": quantity,
+        "Entry_Price": price,
+        "P/L": 0, # P/L is calculated on close
+        "Status": "OPEN"
+    }
+    state.open_positions[symbol] = trade_info
+    if state.ledger is not None:
+        state.ledger.record_open(state.user, trade_info)
+    state.log(f"DEMO: OPENED trade: {side} {quantity} {symbol.split('/')[0]} at ${price:.2f}")
+    return trade_info
+
+
+def close_trade_demo(state, symbol, current_price, quantity=None):
+    """Simulates closing a trade (or, with a smaller ``quantity``, part of it) and records it."""
+    position = state.open_positions.pop(symbol) # Remove from open positions
+    entry_price = position['Entry_Price']
+    side = position['Side']
+    if quantity is not None and quantity < position['Quantity']:
+        # Partial fill: keep the remainder open
+        state.open_positions[symbol] = dict(position, Quantity=position['Quantity'] - quantity)
+    else:
+        quantity = position['Quantity']
+
+    # Calculate dummy profit/loss (simplified for demo, no real fees)
+    if side == "BUY":
+        profit_loss = (current_price - entry_price) * quantity
+    else: # SELL
+        profit_loss = (entry_price - current_price) * quantity
+
+    state.total_profit += profit_loss
+
+    trade_log = {
+        "Date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "Symbol": symbol,
+        "Side": side,
+        "Quantity": quantity,
+        "P/L": profit_loss,
+        "Cumulative P/L": state.total_profit,
+        "Reason": "Bot Close"
+    }
+    state.trades_executed.append(trade_log)
+    if state.ledger is not None and len(state.trades_executed) > RECENT_TRADES_LIMIT:
+        del state.trades_executed[:-RECENT_TRADES_LIMIT]
+    state.trade_metrics.update(profit_loss)
+    if state.ledger is not None:
+        state.ledger.record_close(state.user, trade_log, state.open_positions.get(symbol))
+        state.save()
+    state.log(f"DEMO: CLOSED trade: {side} {quantity} {symbol.split('/')[0]} at ${current_price:.2f} | P/L: ${profit_loss:.2f}")
+    if state.outbox is not None:
+        state.outbox.trade_alert(state.user, f"{trade_log['Date']} CLOSED {side} {quantity} {symbol} at "
+                                             f"${current_price:.2f} | P/L: ${profit_loss:.2f}")
+    return trade_log
+
+
+def _fill_open(state, symbol, side):
+    def on_fill(qty, price):
+        with state.lock:
+            execute_trade_demo(state, symbol, side, qty, price)
+    return on_fill
+
+
+def _fill_close(state, symbol):
+    def on_fill(qty, price):
+        with state.lock:
+            if symbol in state.open_positions:
+                close_trade_demo(state, symbol, price, qty)
+    return on_fill
+
+
+def _bar_signal(state, symbol, history, aggregator):
+    """
+    Entry signal on bar closes: feed bars closed since the last tick into the history and
+    evaluate the newest close against the bars before it. HOLD when no bar closed.
+    """
+    tf = state.signal_timeframe
+    total = aggregator.closed_count(tf)
+    seen = state.bars_seen.get((symbol, tf))
+    if seen is None:
+        seen = max(0, total - state.window - 1)  # warm start from bars already aggregated
+    state.bars_seen[(symbol, tf)] = total
+    closes = aggregator.closes(tf, total - seen) if total > seen else ()
+    if not len(closes):
+        return "HOLD"
+    for close in closes[:-1]:
+        history.push(close)
+    return history.update(state.strategy, closes[-1])
+
+
+def _check_exit(state, symbol, current_price, orders):
+    position = state.open_positions[symbol]
+    entry_price = position['Entry_Price']
+
+    # Simple profit/loss check
+    if position['Side'] == "BUY":
+        profit_pct = (current_price - entry_price) / entry_price * 100
+    else: # SELL position
+        profit_pct = (entry_price - current_price) / entry_price * 100
+    if profit_pct >= state.min_profit or profit_pct <= -state.max_loss: # Trigger close on profit or loss
+        if orders is not None:
+            close_side = "SELL" if position['Side'] == "BUY" else "BUY"
+            orders.add(state.user, symbol, close_side, position['Quantity'], current_price,
+                       _fill_close(state, symbol))
+        else:
+            close_trade_demo(state, symbol, current_price)
+
+
+def _open(state, symbol, signal, current_price, orders):
+    if orders is not None:
+        orders.add(state.user, symbol, signal, state.quantity, current_price, _fill_open(state, symbol, signal))
+    else:
+        execute_trade_demo(state, symbol, signal, state.quantity, current_price)
+
+
+def _run_batch(state, price_fn, orders):
+    """Tick mode over many symbols: one vectorized signal pass instead of a RollingStats call per symbol."""
+    matrix = state.signal_matrix_for()
+    prices = matrix.prices(price_fn)
+    held = list(state.open_positions)
+    for symbol in held:
+        i = matrix.index.get(symbol)
+        if i is not None and not np.isnan(prices[i]):
+            _check_exit(state, symbol, float(prices[i]), orders)
+    with timer("signal_eval_seconds", strategy=state.strategy):
+        signals = matrix.signals(state.strategy, prices)
+    held = set(held)
+    for i in np.flatnonzero(signals):
+        symbol = matrix.symbols[i]
+        if symbol not in held:
+            _open(state, symbol, SIGNAL_NAMES[signals[i]], float(prices[i]), orders)
+    matrix.push(prices)
+
+
+def run_trading_bot_logic(state, price_fn=get_live_price, orders=None, bars=None):
+    """
+    One tick of the demo bot for ``state``: exit checks on open positions, signals otherwise.
+
+    With an OrderNetter as ``orders``, opens and closes are queued as intents and only
+    applied when the netter's fills come back; otherwise they execute immediately.
+    ``bars`` maps symbol -> BarAggregator (already updated for this tick); it is needed
+    when the bot evaluates signals on bar closes instead of ticks. Tick-mode bots with
+    BATCH_SIGNAL_MIN_SYMBOLS or more symbols take the vectorized path (same signals).
+    """
+    with state.lock:
+        if not state.signal_timeframe and len(state.symbols) >= BATCH_SIGNAL_MIN_SYMBOLS:
+            _run_batch(state, price_fn, orders)
+            state.last_run_time = datetime.datetime.now()
+            return
+        if state.signal_matrix is not None:
+            state.leave_batch_mode()
+        for symbol in state.symbols:
+            current_price = price_fn(symbol)
+            if not current_price:
+                continue
+
+            # Ring buffer plus running mean/max/min, so each tick costs O(1) regardless of window
+            history = state.history_for(symbol)
+            aggregator = bars.get(symbol) if (bars and state.signal_timeframe) else None
+
+            # Check for open positions first
+            if symbol in state.open_positions:
+                _check_exit(state, symbol, current_price, orders)
+            else:
+                # If no open position, look for new signals against the ticks (or bars) before this one
+                with timer("signal_eval_seconds", strategy=state.strategy):
+                    if aggregator is not None:
+                        signal = _bar_signal(state, symbol, history, aggregator)
+                    elif state.signal_timeframe:
+                        signal = "HOLD" # No bars for this symbol yet
+                    else:
+                        signal = history.signal(state.strategy, current_price)
+                if signal in ["BUY", "SELL"]:
+                    _open(state, symbol, signal, current_price, orders)
+
+            if not state.signal_timeframe:
+                history.push(current_price) # In bar mode _bar_signal feeds closed bars instead
+        state.last_run_time = datetime.datetime.now()
@@ -0,0 +1,221 @@
+"""
+Cross-worker coordination so each user's bot is ticked by exactly one process.
+
+Workers register in the ``workers`` table and heartbeat every tick; each also holds
+an flock on ``<dir>/worker-<id>.lock`` for its whole life, so a worker on the same
+host that died is noticed at once (its lock can be taken) instead of after the
+heartbeat TTL. Users are spread over the live workers with a consistent-hash ring,
+so adding or removing a worker moves only ~1/n of them.
+
+A worker ticks a user's bot only while it holds that user's row in ``bot_leases``.
+Leases are taken and renewed with a compare-and-set (free, expired or already
+ours), renewed every tick and released when the ring hands the user to someone
+else; a dead worker's leases simply expire and the new owner takes them over.
+Dashboards on other workers change a bot by posting to ``bot_commands``, which the
+lease holder applies on its next tick.
+"""
+import bisect
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from trading.db import get_pool
+from trading.telemetry import inc
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DB_PATH", "users.db")
+WORKER_COORDINATION_DIR = os.getenv("WORKER_COORDINATION_DIR")  # set to enable multi-worker mode
+LEASE_TTL = float(os.getenv("LEASE_TTL", 30))        # seconds a lease or heartbeat stays valid unrenewed
+RING_VNODES = 64                                      # points per worker on the hash ring
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY, host TEXT NOT NULL, pid INTEGER NOT NULL, heartbeat_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bot_leases (
+    user TEXT PRIMARY KEY, worker_id TEXT NOT NULL, expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bot_commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL, action TEXT NOT NULL, payload TEXT, created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bot_commands_user ON bot_commands (user, id);
+"""
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hashing with virtual nodes; owner() is a binary search."""
+
+    def __init__(self, members=(), vnodes: int = RING_VNODES):
+        self.members = tuple(sorted(members))
+        points = sorted((_hash(f"{m}#{i}"), m) for m in self.members for i in range(vnodes))
+        self._keys = [p for p, _ in points]
+        self._owners = [m for _, m in points]
+
+    def owner(self, key):
+        if not self._keys:
+            return None
+        i = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[i]
+
+
+class Coordinator:
+    def __init__(self, path: str = DB_PATH, lock_dir: str = WORKER_COORDINATION_DIR, lease_ttl: float = LEASE_TTL,
+                 worker_id: str = None):
+        self.db = get_pool(path)
+        self.db.connection().executescript(SCHEMA)
+        self.lease_ttl = lease_ttl
+        self.host = socket.gethostname()
+        self.worker_id = worker_id or f"{self.host}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lock_dir = lock_dir
+        self._lock_fd = None
+        self._held = {}          # user -> lease expiry we last wrote
+        self._lock = threading.Lock()
+        self.ring = HashRing([self.worker_id])
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+            self._lock_fd = os.open(self._lock_path(self.worker_id), os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)  # held until the process exits
+        self.heartbeat()
+
+    def _lock_path(self, worker_id):
+        return os.path.join(self.lock_dir, "worker-" + hashlib.sha1(worker_id.encode()).hexdigest()[:16] + ".lock")
+
+    # --- membership -------------------------------------------------------
+    def heartbeat(self, now=None):
+        now = time.time() if now is None else now
+        with self.db.transaction() as conn:
+            conn.execute("INSERT INTO workers (worker_id, host, pid, heartbeat_at) VALUES (?, ?, ?, ?)"
+                         " ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                         (self.worker_id, self.host, os.getpid(), now))
+        self.ring = HashRing(self.live_workers(now))
+        return self.ring
+
+    def _dead_on_this_host(self, worker_id):
+        """True if a same-host worker's lock file can be locked, i.e. its process is gone."""
+        if not self.lock_dir or worker_id == self.worker_id:
+            return False
+        path = self._lock_path(worker_id)
+        if not os.path.exists(path):
+            return False
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            return False  # another worker just reaped it
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        else:
+            os.unlink(path)
+            return True
+        finally:
+            os.close(fd)
+
+    def live_workers(self, now=None):
+        now = time.time() if now is None else now
+        rows = self.db.fetchall("SELECT worker_id, host, heartbeat_at FROM workers")
+        live, dead = [], []
+        for worker_id, host, heartbeat_at in rows:
+            if heartbeat_at < now - self.lease_ttl or (host == self.host and self._dead_on_this_host(worker_id)):
+                dead.append(worker_id)
+            else:
+                live.append(worker_id)
+        if dead:
+            # Forget them and free their leases now rather than waiting for them to expire
+            with self.db.transaction() as conn:
+                conn.executemany("DELETE FROM workers WHERE worker_id = ?", [(w,) for w in dead])
+                conn.executemany("UPDATE bot_leases SET expires_at = 0 WHERE worker_id = ?", [(w,) for w in dead])
+            logger.warning("workers gone: %s", ", ".join(dead))
+            inc("coordination_failovers_total", len(dead))
+        return live
+
+    def owns(self, user) -> bool:
+        """Whether the ring assigns ``user`` to this worker (leases decide who actually ticks it)."""
+        return self.ring.owner(user) == self.worker_id
+
+    # --- leases -------------------------------------------------------------
+    def holds(self, user, now=None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._held.get(user, 0) > now
+
+    def acquire(self, users, now=None):
+        """Take or renew leases on ``users``; returns the ones we now hold."""
+        now = time.time() if now is None else now
+        expires = now + self.lease_ttl
+        got = set()
+        with self.db.transaction() as conn:
+            for user in users:
+                cur = conn.execute(
+                    "INSERT INTO bot_leases (user, worker_id, expires_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT(user) DO UPDATE SET worker_id = excluded.worker_id,"
+                    " expires_at = excluded.expires_at"
+                    " WHERE bot_leases.worker_id = excluded.worker_id OR bot_leases.expires_at < ?",
+                    (user, self.worker_id, expires, now))
+                if cur.rowcount:
+                    got.add(user)
+        with self._lock:
+            for user in users:
+                if user in got:
+                    self._held[user] = expires
+                else:
+                    self._held.pop(user, None)
+        return got
+
+    def release(self, users):
+        users = list(users)
+        if not users:
+            return
+        with self.db.transaction() as conn:
+            conn.executemany("DELETE FROM bot_leases WHERE user = ? AND worker_id = ?",
+                             [(u, self.worker_id) for u in users])
+        with self._lock:
+            for user in users:
+                self._held.pop(user, None)
+
+    def held(self):
+        with self._lock:
+            return set(self._held)
+
+    # --- commands -----------------------------------------------------------
+    def post(self, user, action, **payload):
+        with self.db.transaction() as conn:
+            conn.execute("INSERT INTO bot_commands (user, action, payload, created_at) VALUES (?, ?, ?, ?)",
+                         (user, action, json.dumps(payload), time.time()))
+
+    def pending_users(self):
+        return [r[0] for r in self.db.fetchall("SELECT DISTINCT user FROM bot_commands")]
+
+    def take_commands(self, users):
+        """Remove and return (user, action, payload) for ``users``, oldest first."""
+        users = list(users)
+        if not users:
+            return []
+        marks = ",".join("?" * len(users))
+        with self.db.transaction() as conn:
+            rows = conn.execute(f"SELECT id, user, action, payload FROM bot_commands WHERE user IN ({marks})"
+                                " ORDER BY id", users).fetchall()
+            conn.executemany("DELETE FROM bot_commands WHERE id = ?", [(r[0],) for r in rows])
+        return [(user, action, json.loads(payload or "{}")) for _, user, action, payload in rows]
+
+    def shutdown(self):
+        """Hand everything back at once (a graceful stop, unlike a crash, need not wait for expiry)."""
+        self.release(self.held())
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+        if self._lock_fd is not None:
+            os.unlink(self._lock_path(self.worker_id))
+            os.close(self._lock_fd)
+            self._lock_fd = None
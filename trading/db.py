@@ -0,0 +1,100 @@
+import contextlib
+import sqlite3
+import threading
+import weakref
+
+from trading.telemetry import timer
+
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection
+
+
+def connect(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a connection with the settings every connection to our database should use."""
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread, timeout=BUSY_TIMEOUT_MS / 1000,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    conn.execute("PRAGMA journal_mode=WAL")       # readers never block the writer and vice versa
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")     # durable at checkpoints; safe with WAL
+    return conn
+
+
+class ConnectionPool:
+    """
+    One SQLite connection per thread, so concurrent Streamlit sessions never share a
+    cursor. sqlite3 caches prepared statements per connection, and a thread keeps
+    its connection for its whole life, so repeated queries skip re-parsing.
+    Connections of threads that have exited are closed on the next checkout.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._owners = {}  # id(conn) -> (weakref to owning thread, conn)
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only ever used by this thread; check_same_thread=False just lets _reap close it from another
+            conn = connect(self.path, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._reap()
+                self._owners[id(conn)] = (weakref.ref(threading.current_thread()), conn)
+        return conn
+
+    def _reap(self):
+        for key, (thread_ref, conn) in list(self._owners.items()):
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                del self._owners[key]
+                conn.close()
+
+    def execute(self, sql: str, params=()):
+        with timer("sqlite_query_seconds", op="execute"):
+            return self.connection().execute(sql, params)
+
+    def fetchone(self, sql: str, params=()):
+        with timer("sqlite_query_seconds", op="fetchone"):
+            return self.connection().execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params=()):
+        with timer("sqlite_query_seconds", op="fetchall"):
+            return self.connection().execute(sql, params).fetchall()
+
+    @contextlib.contextmanager
+    def transaction(self, immediate: bool = True):
+        """
+        ``with pool.transaction() as conn:`` commits on success and rolls back on error.
+        BEGIN IMMEDIATE takes the write lock up front, so read-then-write sequences
+        (e.g. "is this email taken? then insert") cannot interleave between sessions.
+        """
+        conn = self.connection()
+        with timer("sqlite_query_seconds", op="transaction"):
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    def __len__(self):
+        return len(self._owners)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str) -> ConnectionPool:
+    """Process-wide pool per database file (Streamlit reruns reuse it)."""
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = ConnectionPool(path)
+    return pool
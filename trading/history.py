@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class PriceHistory:
+    """
+    Fixed-size circular price buffer with O(1) append.
+
+    Every value is written twice, at ``i`` and ``i + capacity``, so the most recent
+    ``len(self)`` prices are always one contiguous slice and ``view()`` can hand out
+    a zero-copy NumPy view instead of concatenating the two halves of the ring.
+    """
+
+    __slots__ = ("capacity", "_buf", "_head", "_size")
+
+    def __init__(self, capacity: int = 20, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = int(capacity)
+        self._buf = np.zeros(2 * self.capacity, dtype=dtype)
+        self._head = 0  # slot the next value is written to
+        self._size = 0
+
+    def append(self, price: float) -> None:
+        self._buf[self._head] = price
+        self._buf[self._head + self.capacity] = price
+        self._head = (self._head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def extend(self, prices) -> None:
+        for p in prices:
+            self.append(p)
+
+    def view(self) -> np.ndarray:
+        """Oldest-to-newest prices as a read-only view; valid until the next append."""
+        start = self._head + self.capacity - self._size
+        v = self._buf[start:start + self._size]
+        v.flags.writeable = False
+        return v
+
+    def last(self) -> float:
+        if not self._size:
+            raise IndexError("history is empty")
+        return float(self._buf[self._head + self.capacity - 1])
+
+    def oldest(self) -> float:
+        if not self._size:
+            raise IndexError("history is empty")
+        return float(self._buf[self._head + self.capacity - self._size])
+
+    def full(self) -> bool:
+        return self._size == self.capacity
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return f"PriceHistory(capacity={self.capacity}, size={self._size})"
@@ -0,0 +1,144 @@
+from collections import deque
+
+from trading.history import PriceHistory
+
+# Entry rules shared by get_trading_signal, the rolling engine below and the backtester.
+# Each strategy needs strictly more than MIN_HISTORY past ticks before it can fire.
+MOMENTUM_MIN_HISTORY = 5
+MOMENTUM_UP = 1.005      # BUY when price > last * MOMENTUM_UP
+MOMENTUM_DOWN = 0.995    # SELL when price < last * MOMENTUM_DOWN
+BREAKOUT_MIN_HISTORY = 10
+BREAKOUT_UP = 1.01       # BUY when price > window high * BREAKOUT_UP
+BREAKOUT_DOWN = 0.99     # SELL when price < window low * BREAKOUT_DOWN
+MEAN_REVERSION_MIN_HISTORY = 10
+MEAN_REVERSION_LOW = 0.99    # BUY when price < window mean * MEAN_REVERSION_LOW
+MEAN_REVERSION_HIGH = 1.01   # SELL when price > window mean * MEAN_REVERSION_HIGH
+
+STRATEGIES = ("Momentum", "Breakout", "Mean Reversion")
+
+
+def get_trading_signal(strategy_name, current_price, history_prices):
+    # Simplified dummy signal generation for demo.
+    # Reference implementation over a window array (oldest to newest); the live bot uses
+    # RollingStats.signal, which applies the same thresholds incrementally.
+    if strategy_name == "Momentum":
+        if len(history_prices) > MOMENTUM_MIN_HISTORY:
+            if current_price > history_prices[-1] * MOMENTUM_UP: # Price increased recently
+                return "BUY"
+            elif current_price < history_prices[-1] * MOMENTUM_DOWN: # Price decreased recently
+                return "SELL"
+    elif strategy_name == "Breakout":
+        if len(history_prices) > BREAKOUT_MIN_HISTORY:
+            if current_price > history_prices.max() * BREAKOUT_UP: # Broke above recent high
+                return "BUY"
+            elif current_price < history_prices.min() * BREAKOUT_DOWN: # Broke below recent low
+                return "SELL"
+    elif strategy_name == "Mean Reversion":
+        if len(history_prices) > MEAN_REVERSION_MIN_HISTORY:
+            mean_price = history_prices.mean()
+            if current_price < mean_price * MEAN_REVERSION_LOW: # Price below mean
+                return "BUY"
+            elif current_price > mean_price * MEAN_REVERSION_HIGH: # Price above mean
+                return "SELL"
+    return "HOLD" # Default
+
+
+class RollingStats:
+    """
+    Sliding-window mean/max/min updated in O(1) amortized per tick.
+
+    Keeps a running sum for the mean and monotonic deques of (tick index, price)
+    for the max and min, so nothing is rescanned when the window is thousands of
+    ticks long. Prices themselves live in a PriceHistory ring buffer.
+    """
+
+    # Recompute the running sum from the buffer this often to cancel float drift
+    RESYNC_EVERY = 4096
+
+    def __init__(self, window: int = 20):
+        self.history = PriceHistory(window)
+        self._sum = 0.0
+        self._maxq = deque()  # decreasing prices
+        self._minq = deque()  # increasing prices
+        self._ticks = 0       # index of the next pushed tick
+
+    @property
+    def window(self) -> int:
+        return self.history.capacity
+
+    def push(self, price: float) -> None:
+        price = float(price)
+        if self.history.full():
+            self._sum -= self.history.oldest()
+        self.history.append(price)
+        self._sum += price
+
+        i = self._ticks
+        self._ticks += 1
+        expired = i - self.window  # ticks at or before this index have left the window
+        while self._maxq and self._maxq[-1][1] <= price:
+            self._maxq.pop()
+        self._maxq.append((i, price))
+        if self._maxq[0][0] <= expired:
+            self._maxq.popleft()
+        while self._minq and self._minq[-1][1] >= price:
+            self._minq.pop()
+        self._minq.append((i, price))
+        if self._minq[0][0] <= expired:
+            self._minq.popleft()
+
+        if self._ticks % self.RESYNC_EVERY == 0:
+            self._sum = float(self.history.view().sum())
+
+    def __len__(self):
+        return len(self.history)
+
+    @property
+    def last(self) -> float:
+        return self.history.last()
+
+    @property
+    def mean(self) -> float:
+        return self._sum / len(self.history) if len(self.history) else 0.0
+
+    @property
+    def max(self) -> float:
+        return self._maxq[0][1]
+
+    @property
+    def min(self) -> float:
+        return self._minq[0][1]
+
+    def view(self):
+        return self.history.view()
+
+    def signal(self, strategy_name: str, current_price: float) -> str:
+        """Same rules as get_trading_signal, evaluated against the ticks pushed so far."""
+        n = len(self.history)
+        if strategy_name == "Momentum":
+            if n > MOMENTUM_MIN_HISTORY:
+                last = self.last
+                if current_price > last * MOMENTUM_UP:
+                    return "BUY"
+                elif current_price < last * MOMENTUM_DOWN:
+                    return "SELL"
+        elif strategy_name == "Breakout":
+            if n > BREAKOUT_MIN_HISTORY:
+                if current_price > self.max * BREAKOUT_UP:
+                    return "BUY"
+                elif current_price < self.min * BREAKOUT_DOWN:
+                    return "SELL"
+        elif strategy_name == "Mean Reversion":
+            if n > MEAN_REVERSION_MIN_HISTORY:
+                mean_price = self.mean
+                if current_price < mean_price * MEAN_REVERSION_LOW:
+                    return "BUY"
+                elif current_price > mean_price * MEAN_REVERSION_HIGH:
+                    return "SELL"
+        return "HOLD"
+
+    def update(self, strategy_name: str, current_price: float) -> str:
+        """Evaluate the signal for ``current_price`` and then add it to the window."""
+        signal = self.signal(strategy_name, current_price)
+        self.push(current_price)
+        return signal
@@ -0,0 +1,255 @@
+"""
+Durable SQLite ledger for bot sessions, open positions and closed trades.
+
+Writes from the trading loop are queued and group-committed by a background
+flusher (one transaction per batch) so a tick never waits on fsync. The database
+runs in WAL mode so dashboard reads are not blocked by those commits.
+"""
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from trading.db import connect as db_connect
+from trading.telemetry import inc, timer
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DB_PATH", "users.db")
+LEDGER_FLUSH_INTERVAL = float(os.getenv("LEDGER_FLUSH_INTERVAL", 0.5))  # seconds
+LEDGER_MAX_BATCH = 500
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bot_sessions (
+    user TEXT PRIMARY KEY,
+    strategy TEXT, min_profit REAL, max_loss REAL, symbols TEXT, timeframe TEXT,
+    started_at TEXT, running INTEGER NOT NULL DEFAULT 0,
+    total_profit REAL NOT NULL DEFAULT 0, metrics TEXT
+);
+CREATE TABLE IF NOT EXISTS positions (
+    user TEXT NOT NULL, symbol TEXT NOT NULL, side TEXT, quantity REAL,
+    entry_price REAL, opened_at TEXT,
+    PRIMARY KEY (user, symbol)
+);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL, closed_at TEXT NOT NULL, symbol TEXT, side TEXT,
+    quantity REAL, pnl REAL, cumulative_pnl REAL, reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_user_closed_at ON trades (user, closed_at);
+CREATE INDEX IF NOT EXISTS idx_trades_user_symbol_side_closed_at ON trades (user, symbol, side, closed_at);
+"""
+
+# Columns added after a table first shipped: (table, column, declaration)
+MIGRATIONS = (
+    ("bot_sessions", "signal_timeframe", "TEXT"),
+)
+
+TRADE_COLUMNS = ("Date", "Symbol", "Side", "Quantity", "P/L", "Cumulative P/L", "Reason")
+
+
+def _fmt(ts):
+    if isinstance(ts, datetime.datetime):
+        return ts.strftime(DATE_FORMAT)
+    return ts
+
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    # Shared between the flusher thread and callers of flush()/reads, so guarded by locks instead
+    # (_write_lock for the write connection, _read_lock for the read one)
+    return db_connect(path, check_same_thread=False)
+
+
+class TradeLedger:
+    def __init__(self, path: str = DB_PATH, flush_interval: float = LEDGER_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._write_conn = connect(path)
+        self._write_conn.executescript(SCHEMA)
+        for table, column, decl in MIGRATIONS:
+            existing = {row[1] for row in self._write_conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                self._write_conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        self._write_conn.commit()
+        self._read_conn = connect(path)
+        self._read_lock = threading.Lock()
+        self._write_lock = threading.Lock()  # one flush at a time: batches commit whole and in queue order
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._run_flusher, name="ledger-flusher", daemon=True)
+        self._flusher.start()
+
+    # --- batched writes -------------------------------------------------
+    def _enqueue(self, sql, params):
+        with self._pending_lock:
+            self._pending.append((sql, params))
+            if len(self._pending) >= LEDGER_MAX_BATCH:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """Commit everything queued so far in a single transaction."""
+        with self._write_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            inc("ledger_writes_total", len(batch))
+            try:
+                with timer("sqlite_query_seconds", op="ledger_flush"), self._write_conn:
+                    # Consecutive statements with the same SQL go through one executemany
+                    i = 0
+                    while i < len(batch):
+                        sql = batch[i][0]
+                        j = i
+                        while j < len(batch) and batch[j][0] == sql:
+                            j += 1
+                        self._write_conn.executemany(sql, [p for _, p in batch[i:j]])
+                        i = j
+            except sqlite3.Error:
+                logger.exception("ledger flush failed; %d write(s) re-queued", len(batch))
+                with self._pending_lock:
+                    self._pending[:0] = batch
+                raise
+            return len(batch)
+
+    def _run_flusher(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        self._closed.set()
+        self._wake.set()
+        self._flusher.join(5)
+        self.flush()
+        with self._write_lock:
+            self._write_conn.close()
+        self._read_conn.close()
+
+    # --- recording (called from the trading loop) ----------------------
+    def save_session(self, state):
+        self._enqueue(
+            "INSERT INTO bot_sessions (user, strategy, min_profit, max_loss, symbols, timeframe,"
+            " started_at, running, total_profit, metrics, signal_timeframe) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(user) DO UPDATE SET strategy=excluded.strategy, min_profit=excluded.min_profit,"
+            " max_loss=excluded.max_loss, symbols=excluded.symbols, timeframe=excluded.timeframe,"
+            " started_at=excluded.started_at, running=excluded.running,"
+            " total_profit=excluded.total_profit, metrics=excluded.metrics,"
+            " signal_timeframe=excluded.signal_timeframe",
+            (state.user, state.strategy, state.min_profit, state.max_loss, json.dumps(state.symbols),
+             state.timeframe, _fmt(state.start_time), int(state.running), state.total_profit,
+             state.trade_metrics.to_json(), state.signal_timeframe))
+
+    def reset_user(self, user):
+        """A fresh start: drop the user's open positions (closed trades are kept as history)."""
+        self._enqueue("DELETE FROM positions WHERE user = ?", (user,))
+
+    def record_open(self, user, trade_info):
+        self._enqueue(
+            "INSERT OR REPLACE INTO positions (user, symbol, side, quantity, entry_price, opened_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (user, trade_info["Symbol"], trade_info["Side"], trade_info["Quantity"],
+             trade_info["Entry_Price"], _fmt(trade_info["Date"])))
+
+    def record_close(self, user, trade_log, remaining=None):
+        """A closed trade; ``remaining`` is the position left open after a partial close."""
+        if remaining is None:
+            self._enqueue("DELETE FROM positions WHERE user = ? AND symbol = ?", (user, trade_log["Symbol"]))
+        else:
+            self.record_open(user, remaining)
+        self._enqueue(
+            "INSERT INTO trades (user, closed_at, symbol, side, quantity, pnl, cumulative_pnl, reason)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (user, _fmt(trade_log["Date"]), trade_log["Symbol"], trade_log["Side"], trade_log["Quantity"],
+             trade_log["P/L"], trade_log["Cumulative P/L"], trade_log["Reason"]))
+
+    # --- reads ----------------------------------------------------------
+    def _query(self, sql, params=()):
+        with self._read_lock, timer("sqlite_query_seconds", op="ledger_read"):
+            return self._read_conn.execute(sql, params).fetchall()
+
+    def load_session(self, user):
+        rows = self._query(
+            "SELECT strategy, min_profit, max_loss, symbols, timeframe, started_at, running,"
+            " total_profit, metrics, signal_timeframe FROM bot_sessions WHERE user = ?", (user,))
+        if not rows:
+            return None
+        (strategy, min_profit, max_loss, symbols, timeframe, started_at, running, total_profit, metrics,
+         signal_timeframe) = rows[0]
+        return {
+            "strategy": strategy, "min_profit": min_profit, "max_loss": max_loss,
+            "symbols": json.loads(symbols or "[]"), "timeframe": timeframe,
+            "started_at": datetime.datetime.strptime(started_at, DATE_FORMAT) if started_at else None,
+            "running": bool(running), "total_profit": total_profit, "metrics": metrics,
+            "signal_timeframe": signal_timeframe,
+        }
+
+    def running_users(self):
+        return [r[0] for r in self._query("SELECT user FROM bot_sessions WHERE running = 1")]
+
+    def open_positions(self, user):
+        rows = self._query(
+            "SELECT symbol, side, quantity, entry_price, opened_at FROM positions WHERE user = ?", (user,))
+        return {
+            symbol: {"Date": datetime.datetime.strptime(opened_at, DATE_FORMAT), "Symbol": symbol,
+                     "Side": side, "Quantity": quantity, "Entry_Price": entry_price, "P/L": 0, "Status": "OPEN"}
+            for symbol, side, quantity, entry_price, opened_at in rows
+        }
+
+    @staticmethod
+    def _trade_filter(user, start=None, end=None, symbols=None, sides=None, after=None, before=None):
+        """WHERE clause for the trades queries; ``after``/``before`` are exclusive (closed_at, id) keys."""
+        sql, params = " WHERE user = ?", [user]
+        if start is not None:
+            sql += " AND closed_at >= ?"
+            params.append(_fmt(start))
+        if end is not None:
+            sql += " AND closed_at < ?"
+            params.append(_fmt(end))
+        for column, values in (("symbol", symbols), ("side", sides)):
+            if values:
+                sql += f" AND {column} IN ({','.join('?' * len(values))})"
+                params += list(values)
+        if after is not None:
+            sql += " AND (closed_at, id) > (?, ?)"
+            params += list(after)
+        if before is not None:
+            sql += " AND (closed_at, id) < (?, ?)"
+            params += list(before)
+        return sql, params
+
+    def trades(self, user, start=None, end=None, limit=None, offset=0, newest_first=False, symbols=None, sides=None,
+               after=None, before=None, keys=False):
+        """
+        Closed trades for ``user`` with ``start <= Date < end`` (and, if given, one of
+        ``symbols``/``sides``, strictly between the ``after``/``before`` keys), served from
+        the trades indexes. With ``keys``, returns ((closed_at, id), row) pairs for keyset paging.
+        """
+        where, params = self._trade_filter(user, start, end, symbols, sides, after, before)
+        sql = "SELECT closed_at, symbol, side, quantity, pnl, cumulative_pnl, reason, id FROM trades" + where
+        order = "DESC" if newest_first else "ASC"
+        sql += f" ORDER BY closed_at {order}, id {order}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [int(limit), int(offset)]
+        rows = self._query(sql, params)
+        if keys:
+            return [((row[0], row[-1]), dict(zip(TRADE_COLUMNS, row))) for row in rows]
+        return [dict(zip(TRADE_COLUMNS, row)) for row in rows]
+
+    def count_trades(self, user, start=None, end=None, symbols=None, sides=None, before=None):
+        where, params = self._trade_filter(user, start, end, symbols, sides, before=before)
+        return self._query("SELECT COUNT(*) FROM trades" + where, params)[0][0]
+
+    def trade_symbols(self, user, start=None, before=None):
+        where, params = self._trade_filter(user, start, before=before)
+        return [r[0] for r in self._query("SELECT DISTINCT symbol FROM trades" + where + " ORDER BY symbol", params)]
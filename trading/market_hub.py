@@ -0,0 +1,271 @@
+"""
+Shared market-data hub: one price fetch per symbol per interval, fanned out to every
+subscriber in the process.
+
+Optional cross-worker mode (``shared_dir``): the gunicorn worker holding an flock on
+``leader.lock`` is the only one that calls the exchange; it publishes an atomic JSON
+snapshot that the other workers read, and they register the symbols they need as
+small per-process files the leader merges into its fetch. If the leader dies its
+lock is released by the OS and the next worker to refresh takes over.
+"""
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from trading.bot import get_live_price
+from trading.telemetry import inc, timer
+from trading.tickstore import get_tick_store
+
+logger = logging.getLogger(__name__)
+
+MARKET_HUB_INTERVAL = float(os.getenv("MARKET_HUB_INTERVAL", 10))  # seconds between fetches
+MARKET_HUB_SHARED_DIR = os.getenv("MARKET_HUB_SHARED_DIR")  # set to enable cross-worker mode
+SUBSCRIPTION_TTL = 120  # seconds a subscription lives without being renewed
+
+
+def demo_source(symbols):
+    """Price source for the demo bot: the simulated get_live_price per symbol."""
+    return {symbol: get_live_price(symbol) for symbol in symbols}
+
+
+def broker_source(broker):
+    """Price source backed by a broker's batched get_prices (one round trip per refresh)."""
+    def fetch(symbols):
+        result = broker.get_prices(symbols)
+        for symbol, error in result["errors"].items():
+            logger.warning("price fetch failed for %s: %s", symbol, error)
+        return result["prices"]
+    return fetch
+
+
+class _Subscription:
+    __slots__ = ("symbols", "callback", "expires")
+
+    def __init__(self, symbols, callback, expires):
+        self.symbols = frozenset(symbols)
+        self.callback = callback
+        self.expires = expires
+
+
+class MarketDataHub:
+    def __init__(self, source=demo_source, interval: float = MARKET_HUB_INTERVAL, shared_dir: str = None,
+                 tick_store=None):
+        self.source = source
+        self.tick_store = tick_store  # records every price the hub fetches
+        self.interval = interval
+        self.shared_dir = shared_dir
+        self._latest = {}        # symbol -> (price, fetched_at)
+        self._subs = {}          # subscriber id -> _Subscription
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.RLock()  # re-entrant: subscriber callbacks may read prices()
+        self._leader_fd = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.fetch_count = 0     # exchange fetches made by this process
+        if shared_dir:
+            os.makedirs(os.path.join(shared_dir, "wants"), exist_ok=True)
+
+    # --- pub/sub --------------------------------------------------------
+    def subscribe(self, subscriber_id, symbols, callback=None, ttl: float = SUBSCRIPTION_TTL):
+        """Register (or renew) interest in ``symbols``; ``callback(prices)`` gets each update."""
+        with self._lock:
+            self._subs[subscriber_id] = _Subscription(symbols, callback, time.time() + ttl)
+        self._publish_wants()
+        self.ensure_running()
+
+    def unsubscribe(self, subscriber_id):
+        with self._lock:
+            self._subs.pop(subscriber_id, None)
+        self._publish_wants()
+
+    def wanted_symbols(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, sub in self._subs.items() if sub.expires < now]:
+                del self._subs[key]
+            return set().union(*(sub.symbols for sub in self._subs.values()))
+
+    # --- reads ----------------------------------------------------------
+    def get(self, symbol):
+        entry = self._latest.get(symbol)
+        return entry[0] if entry else None
+
+    def prices(self, symbols, max_age: float = None):
+        """
+        Latest prices for ``symbols``. Anything missing or older than ``max_age`` is
+        refreshed first, in one fetch shared by all concurrent callers.
+        """
+        max_age = self.interval if max_age is None else max_age
+        if self._stale(symbols, max_age):
+            with self._fetch_lock:
+                # Another caller may have refreshed while we waited for the lock
+                if self._stale(symbols, max_age):
+                    self._refresh(set(symbols) | self.wanted_symbols())
+        return {s: self._latest[s][0] for s in symbols if s in self._latest}
+
+    def _stale(self, symbols, max_age):
+        cutoff = time.time() - max_age
+        return any(s not in self._latest or self._latest[s][1] < cutoff for s in symbols)
+
+    # --- fetching -------------------------------------------------------
+    def refresh(self):
+        with self._fetch_lock:
+            self._refresh(self.wanted_symbols())
+
+    def _refresh(self, symbols):
+        leader = not self.shared_dir or self._is_leader()
+        if self.shared_dir and leader:
+            symbols = set(symbols) | self._read_wants()
+        if not symbols:
+            return
+        if not leader:
+            fresh = self._read_snapshot()
+            # Leader may not have our symbols yet (it picks up wants on its next pass)
+            missing = [s for s in symbols if s not in fresh]
+            if missing:
+                fresh.update(self._fetch(missing))
+        else:
+            fresh = self._fetch(sorted(symbols))
+            # Only the fetching process records ticks (the store also enforces a single writer)
+            if self.tick_store is not None and fresh:
+                try:
+                    self.tick_store.append_many(fresh)
+                except OSError:
+                    logger.exception("tick store append failed")
+            if self.shared_dir:
+                self._write_snapshot()
+        self._notify(fresh)
+
+    def _fetch(self, symbols):
+        try:
+            with timer("price_fetch_seconds", source="hub"):
+                prices = self.source(list(symbols))
+        except Exception:
+            logger.exception("market data fetch failed")
+            return {}
+        inc("hub_symbols_fetched_total", len(prices))
+        self.fetch_count += 1
+        now = time.time()
+        for symbol, price in prices.items():
+            if price:
+                self._latest[symbol] = (float(price), now)
+        return {s: p for s, p in prices.items() if p}
+
+    def _notify(self, fresh):
+        with self._lock:
+            subs = list(self._subs.values())
+        for sub in subs:
+            if sub.callback is None:
+                continue
+            update = {s: fresh[s] for s in sub.symbols if s in fresh}
+            if update:
+                try:
+                    sub.callback(update)
+                except Exception:
+                    logger.exception("market data subscriber failed")
+
+    # --- cross-worker mode ----------------------------------------------
+    def _is_leader(self):
+        if self._leader_fd is not None:
+            return True
+        fd = os.open(os.path.join(self.shared_dir, "leader.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._leader_fd = fd  # held for the life of the process
+        return True
+
+    def _snapshot_path(self):
+        return os.path.join(self.shared_dir, "prices.json")
+
+    def _write_snapshot(self):
+        data = {s: [p, ts] for s, (p, ts) in self._latest.items()}
+        fd, tmp = tempfile.mkstemp(dir=self.shared_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self._snapshot_path())
+
+    def _read_snapshot(self):
+        try:
+            with open(self._snapshot_path()) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        cutoff = time.time() - 2 * self.interval
+        fresh = {}
+        for symbol, (price, ts) in data.items():
+            if ts >= cutoff:
+                self._latest[symbol] = (price, ts)
+                fresh[symbol] = price
+        return fresh
+
+    def _publish_wants(self):
+        if not self.shared_dir:
+            return
+        path = os.path.join(self.shared_dir, "wants", f"{os.getpid()}.json")
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(sorted(self.wanted_symbols()), f)
+        os.replace(tmp, path)
+
+    def _read_wants(self):
+        wants = set()
+        wants_dir = os.path.join(self.shared_dir, "wants")
+        cutoff = time.time() - SUBSCRIPTION_TTL
+        for name in os.listdir(wants_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(wants_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    continue  # worker went away without cleaning up
+                with open(path) as f:
+                    wants.update(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return wants
+
+    # --- background refresher -------------------------------------------
+    def ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="market-data-hub", daemon=True)
+                self._thread.start()
+
+    def shutdown(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.shared_dir and self._is_leader():
+                    # Every pass, even with no local subscribers: followers depend on the snapshot
+                    self.refresh()
+                else:
+                    self.prices(sorted(self.wanted_symbols()))
+                self._publish_wants()  # keeps our wants file's mtime fresh
+            except Exception:
+                logger.exception("market data hub refresh failed")
+            self._stop.wait(self.interval)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub() -> MarketDataHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = MarketDataHub(shared_dir=MARKET_HUB_SHARED_DIR, tick_store=get_tick_store())
+    return _hub
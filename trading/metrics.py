@@ -0,0 +1,93 @@
+import json
+import math
+
+
+class TradeMetrics:
+    """
+    Streaming version of calculate_metrics_demo: O(1) per closed trade.
+
+    Sharpe uses a Welford running mean/variance of per-trade P/L, drawdown tracks
+    the running peak of cumulative P/L, and wins are counted as they arrive.
+    The state is a handful of floats, so it round-trips through JSON.
+    """
+
+    __slots__ = ("count", "mean", "m2", "cumulative", "peak", "max_drawdown", "wins")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0           # sum of squared deviations from the mean
+        self.cumulative = 0.0
+        self.peak = -math.inf
+        self.max_drawdown = 0.0
+        self.wins = 0
+
+    def update(self, pnl: float) -> None:
+        pnl = float(pnl)
+        self.count += 1
+        delta = pnl - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (pnl - self.mean)
+
+        self.cumulative += pnl
+        if self.cumulative > self.peak:
+            self.peak = self.cumulative
+        # Same definition as the demo: drawdown relative to the peak, skipping undefined 0/0
+        if self.peak != 0:
+            drawdown = (self.cumulative - self.peak) / self.peak
+        elif self.cumulative < 0:
+            drawdown = -math.inf
+        else:
+            drawdown = None
+        if drawdown is not None and drawdown < self.max_drawdown:
+            self.max_drawdown = drawdown
+
+        if pnl > 0:
+            self.wins += 1
+
+    @classmethod
+    def from_pnls(cls, pnls):
+        m = cls()
+        for pnl in pnls:
+            m.update(pnl)
+        return m
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def sharpe(self) -> float:
+        std = self.std
+        return self.mean / std * math.sqrt(365) if std else 0.0
+
+    @property
+    def win_ratio(self) -> float:
+        return self.wins / self.count if self.count else 0.0
+
+    def snapshot(self) -> dict:
+        """Same keys as calculate_metrics_demo."""
+        if not self.count:
+            return {"Sharpe Ratio": 0, "Max Drawdown": 0, "Win Ratio": 0}
+        return {"Sharpe Ratio": self.sharpe, "Max Drawdown": self.max_drawdown, "Win Ratio": self.win_ratio}
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        m = cls()
+        for name in cls.__slots__:
+            if name in state:
+                setattr(m, name, state[name])
+        m.count = int(m.count)
+        m.wins = int(m.wins)
+        return m
+
+    def to_json(self) -> str:
+        # json writes -inf as "-Infinity", which json.loads reads back
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text: str):
+        return cls.from_dict(json.loads(text))
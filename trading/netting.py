@@ -0,0 +1,117 @@
+"""
+Per-tick order netting across users.
+
+During a tick every bot records the orders it wants as intents instead of sending
+them. flush() then nets buys against sells per symbol, sends one aggregated order
+for the remainder and allocates fills back to each user: the part of a side that
+was crossed internally fills at the tick's reference price, the rest shares the
+exchange fill pro rata, so every user on a side gets the same average price.
+"""
+import collections
+import logging
+
+from trading.telemetry import timer
+
+logger = logging.getLogger(__name__)
+
+
+class OrderIntent:
+    __slots__ = ("user", "symbol", "side", "qty", "ref_price", "on_fill")
+
+    def __init__(self, user, symbol, side, qty, ref_price, on_fill):
+        self.user = user
+        self.symbol = symbol
+        self.side = side.upper()
+        self.qty = float(qty)
+        self.ref_price = float(ref_price)
+        self.on_fill = on_fill  # on_fill(filled_qty, avg_price)
+
+
+def demo_send(symbol, side, qty, ref_price):
+    """Simulated execution: the aggregated order fills completely at the reference price."""
+    return {"ok": True, "filled": qty, "price": ref_price}
+
+
+def broker_send(broker):
+    """Send aggregated orders through a CCXT broker's place_market_order."""
+    def send(symbol, side, qty, ref_price):
+        result = broker.place_market_order(symbol, side, qty)
+        if not result["ok"]:
+            return {"ok": False, "filled": 0.0, "price": ref_price, "error": result["error"]}
+        order = result["data"] or {}
+        filled = order.get("filled")
+        return {"ok": True,
+                "filled": float(qty if filled is None else filled),
+                "price": float(order.get("average") or order.get("price") or ref_price)}
+    return send
+
+
+class OrderNetter:
+    def __init__(self):
+        self._intents = collections.defaultdict(list)  # symbol -> [OrderIntent]
+        self.stats = {"intents": 0, "exchange_orders": 0, "crossed_qty": 0.0}
+
+    def add(self, user, symbol, side, qty, ref_price, on_fill):
+        self._intents[symbol].append(OrderIntent(user, symbol, side, qty, ref_price, on_fill))
+        self.stats["intents"] += 1
+
+    def __len__(self):
+        return sum(len(v) for v in self._intents.values())
+
+    def flush(self, send=demo_send):
+        """Net, execute and allocate everything collected this tick. Returns per-symbol reports."""
+        intents, self._intents = self._intents, collections.defaultdict(list)
+        reports = []
+        for symbol, orders in intents.items():
+            reports.append(self._flush_symbol(symbol, orders, send))
+        return reports
+
+    def _flush_symbol(self, symbol, orders, send):
+        buys = [o for o in orders if o.side == "BUY"]
+        sells = [o for o in orders if o.side == "SELL"]
+        buy_qty = sum(o.qty for o in buys)
+        sell_qty = sum(o.qty for o in sells)
+        crossed = min(buy_qty, sell_qty)
+        # Every intent in a tick was priced off the same hub quote; average defensively anyway
+        ref_price = sum(o.ref_price * o.qty for o in orders) / max(buy_qty + sell_qty, 1e-12)
+        self.stats["crossed_qty"] += crossed
+
+        net_qty = abs(buy_qty - sell_qty)
+        net_side = "BUY" if buy_qty > sell_qty else "SELL"
+        report = {"symbol": symbol, "buy_qty": buy_qty, "sell_qty": sell_qty, "crossed": crossed,
+                  "net_side": net_side if net_qty else None, "net_qty": net_qty, "exchange": None}
+
+        ext_filled, ext_price = 0.0, ref_price
+        if net_qty > 1e-12:
+            self.stats["exchange_orders"] += 1
+            try:
+                with timer("order_seconds", exchange="netted"):
+                    result = send(symbol, net_side, net_qty, ref_price)
+            except Exception as e:
+                result = {"ok": False, "filled": 0.0, "price": ref_price, "error": str(e)}
+            report["exchange"] = result
+            if result["ok"]:
+                ext_filled = min(float(result["filled"]), net_qty)
+                ext_price = float(result["price"])
+            else:
+                logger.warning("netted %s %s %s failed: %s", net_side, net_qty, symbol, result.get("error"))
+
+        # The larger side: crossed part at ref_price plus the exchange fill, shared pro rata
+        big, big_qty = (buys, buy_qty) if net_side == "BUY" else (sells, sell_qty)
+        small = sells if big is buys else buys
+        big_filled = crossed + ext_filled
+        big_price = (crossed * ref_price + ext_filled * ext_price) / big_filled if big_filled else ref_price
+        self._allocate(small, 1.0, ref_price)
+        self._allocate(big, big_filled / big_qty if big_qty else 0.0, big_price)
+        return report
+
+    @staticmethod
+    def _allocate(orders, fraction, price):
+        for o in orders:
+            qty = o.qty * fraction
+            if qty <= 0:
+                continue
+            try:
+                o.on_fill(qty, price)
+            except Exception:
+                logger.exception("fill allocation failed for %s %s", o.user, o.symbol)
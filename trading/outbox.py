@@ -0,0 +1,332 @@
+"""
+Persistent notification outbox.
+
+Pages and the trading worker only INSERT a row (a local SQLite write) and return;
+a background dispatcher delivers due rows over one authenticated SMTP connection
+(and a lazily built Twilio client), retrying failures with exponential backoff.
+
+Trade alerts are held for TRADE_ALERT_BATCH_SECONDS and everything pending for the
+same recipient then goes out as one message. Rows are claimed inside a write
+transaction, so several processes can run dispatchers on the same database
+without double-sending; a claim left behind by a crashed process expires after
+CLAIM_TIMEOUT.
+
+For local testing point SMTP_SERVER/SMTP_PORT at any SMTP stand-in (e.g.
+``python -m aiosmtpd -n -l localhost:1025``) with SMTP_SECURITY=none.
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+from trading.db import get_pool
+from trading.telemetry import inc, timer
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DB_PATH", "users.db")
+SMTP_SERVER = os.getenv("SMTP_SERVER")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_FROM = os.getenv("SMTP_FROM") or SMTP_USER
+# "ssl" (SMTP_SSL), "starttls" or "none" (plain, for local stand-ins)
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl" if SMTP_PORT == 465 else "starttls")
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", 60))  # seconds before the pooled connection is closed
+TWILIO_SID = os.getenv("TWILIO_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_PHONE = os.getenv("TWILIO_PHONE")
+
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 5))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 6))
+OUTBOX_BACKOFF = float(os.getenv("OUTBOX_BACKOFF", 2))          # seconds; doubles per attempt
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", 600))
+TRADE_ALERT_BATCH_SECONDS = float(os.getenv("TRADE_ALERT_BATCH_SECONDS", 60))
+CLAIM_TIMEOUT = 300  # seconds a claimed row may stay undelivered before another dispatcher retries it
+BATCH_LIMIT = 100    # rows claimed per dispatch pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL, recipient TEXT NOT NULL, subject TEXT, body TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'message',
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL, next_attempt_at REAL NOT NULL,
+    claimed_at REAL, sent_at REAL, last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class PermanentError(Exception):
+    """Delivery can never succeed (e.g. the recipient was refused); the row is not retried."""
+
+
+class SMTPTransport:
+    """One authenticated SMTP connection, reused across messages and reopened when it drops or idles out."""
+
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, user=SMTP_USER, password=SMTP_PASSWORD,
+                 sender=SMTP_FROM, security=SMTP_SECURITY, idle_timeout=SMTP_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.sender = sender or user
+        self.security = security
+        self.idle_timeout = idle_timeout
+        self._conn = None
+        self._last_used = 0.0
+        self.connects = 0
+
+    @property
+    def configured(self):
+        return bool(self.host and self.port and self.sender)
+
+    def _connect(self):
+        import smtplib
+        import ssl
+        if self.security == "ssl":
+            conn = smtplib.SMTP_SSL(self.host, self.port, context=ssl.create_default_context(), timeout=30)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.security == "starttls":
+                conn.starttls(context=ssl.create_default_context())
+        if self.user and self.password:
+            conn.login(self.user, self.password)
+        self.connects += 1
+        return conn
+
+    def send(self, recipient, subject, body):
+        import smtplib
+        from email.mime.text import MIMEText
+        msg = MIMEText(body)
+        msg['Subject'] = subject or ""
+        msg['From'] = self.sender
+        msg['To'] = recipient
+        self.close_idle()
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = self._connect()
+            try:
+                self._conn.sendmail(self.sender, [recipient], msg.as_string())
+                break
+            except smtplib.SMTPRecipientsRefused as e:
+                raise PermanentError(str(e)) from e
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # The server dropped the pooled connection; reconnect once before giving up
+                self.close()
+                if attempt:
+                    raise
+        self._last_used = time.monotonic()
+
+    def close_idle(self):
+        if self._conn is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.quit()
+            except Exception:
+                pass
+
+
+class TwilioTransport:
+    def __init__(self, sid=TWILIO_SID, token=TWILIO_AUTH_TOKEN, sender=TWILIO_PHONE):
+        self.sid = sid
+        self.token = token
+        self.sender = sender
+        self._client = None
+
+    @property
+    def configured(self):
+        return bool(self.sid and self.token and self.sender)
+
+    def send(self, recipient, subject, body):
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(self.sid, self.token)
+        self._client.messages.create(body=body, from_=self.sender, to=recipient)
+
+    def close_idle(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Outbox:
+    def __init__(self, path: str = DB_PATH, transports=None, poll_interval: float = OUTBOX_POLL_INTERVAL,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS, backoff: float = OUTBOX_BACKOFF,
+                 batch_seconds: float = TRADE_ALERT_BATCH_SECONDS):
+        self.db = get_pool(path)
+        self.db.connection().executescript(SCHEMA)
+        self.transports = transports if transports is not None else {"email": SMTPTransport(),
+                                                                     "sms": TwilioTransport()}
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.batch_seconds = batch_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def configured(self, channel):
+        transport = self.transports.get(channel)
+        return transport is not None and transport.configured
+
+    # --- enqueue (called from pages and the trading worker) -------------
+    def enqueue(self, channel, recipient, body, subject=None, kind="message", delay: float = 0.0) -> int:
+        now = time.time()
+        with self.db.transaction() as conn:
+            row_id = conn.execute(
+                "INSERT INTO outbox (channel, recipient, subject, body, kind, created_at, next_attempt_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (channel, recipient, subject, body, kind, now, now + delay)).lastrowid
+        inc("outbox_enqueued_total", channel=channel, kind=kind)
+        self.ensure_running()
+        if not delay:
+            self._wake.set()
+        return row_id
+
+    def send_email(self, to_email, subject, body) -> int:
+        return self.enqueue("email", to_email, body, subject)
+
+    def send_sms(self, to_phone, body) -> int:
+        return self.enqueue("sms", to_phone, body)
+
+    def trade_alert(self, recipient, text, channel="email") -> int:
+        """Held for the batch window, then merged with the recipient's other pending alerts."""
+        return self.enqueue(channel, recipient, text, kind="trade_alert", delay=self.batch_seconds)
+
+    def status(self, row_id):
+        row = self.db.fetchone("SELECT status, attempts, last_error FROM outbox WHERE id = ?", (row_id,))
+        return None if row is None else {"status": row[0], "attempts": row[1], "error": row[2]}
+
+    def pending_count(self):
+        return self.db.fetchone("SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')")[0]
+
+    # --- dispatch --------------------------------------------------------
+    def _claim(self, now):
+        """Due rows, plus every pending trade alert of a recipient with a due alert, marked as ours."""
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending' AND claimed_at < ?",
+                         (now - CLAIM_TIMEOUT,))
+            rows = conn.execute(
+                "SELECT id, channel, recipient, subject, body, kind, attempts FROM outbox"
+                " WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, BATCH_LIMIT)).fetchall()
+            alert_keys = {(r[1], r[2]) for r in rows if r[5] == "trade_alert"}
+            for channel, recipient in alert_keys:
+                rows += conn.execute(
+                    "SELECT id, channel, recipient, subject, body, kind, attempts FROM outbox"
+                    " WHERE status = 'pending' AND kind = 'trade_alert' AND channel = ? AND recipient = ?"
+                    " AND next_attempt_at > ?", (channel, recipient, now)).fetchall()
+            conn.executemany("UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ?",
+                             [(now, r[0]) for r in rows])
+        return rows
+
+    def dispatch(self) -> int:
+        """Deliver everything due now; returns the number of rows sent."""
+        rows = self._claim(time.time())
+        messages = []  # (row ids, channel, recipient, subject, body, attempts)
+        alerts = {}
+        for row_id, channel, recipient, subject, body, kind, attempts in rows:
+            if kind == "trade_alert":
+                alerts.setdefault((channel, recipient), []).append((row_id, body, attempts))
+            else:
+                messages.append(([row_id], channel, recipient, subject, body, attempts))
+        for (channel, recipient), batch in alerts.items():
+            batch.sort()
+            subject = f"MBU Trading Bot: {len(batch)} trade alert{'s' if len(batch) > 1 else ''}"
+            body = "\n".join(text for _, text, _ in batch)
+            messages.append(([i for i, _, _ in batch], channel, recipient, subject, body,
+                             max(a for _, _, a in batch)))
+
+        sent = 0
+        for ids, channel, recipient, subject, body, attempts in messages:
+            transport = self.transports.get(channel)
+            try:
+                if transport is None or not transport.configured:
+                    raise PermanentError(f"{channel} delivery is not configured")
+                with timer("notification_send_seconds", channel=channel):
+                    transport.send(recipient, subject, body)
+            except Exception as e:
+                self._failed(ids, attempts + 1, e)
+            else:
+                self._mark(ids, "status = 'sent', sent_at = ?, attempts = attempts + 1", (time.time(),))
+                inc("outbox_sent_total", len(ids), channel=channel)
+                sent += len(ids)
+        return sent
+
+    def _failed(self, ids, attempts, error):
+        permanent = isinstance(error, PermanentError) or attempts >= self.max_attempts
+        error_text = f"{type(error).__name__}: {error}"
+        if permanent:
+            logger.error("notification %s failed permanently: %s", ids, error_text)
+            self._mark(ids, "status = 'failed', attempts = ?, last_error = ?", (attempts, error_text))
+            inc("outbox_failed_total", len(ids))
+            return
+        delay = min(self.backoff * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF) * random.uniform(0.8, 1.2)
+        logger.warning("notification %s failed (attempt %d), retrying in %.1fs: %s", ids, attempts, delay,
+                       error_text)
+        self._mark(ids, "status = 'pending', attempts = ?, last_error = ?, next_attempt_at = ?",
+                   (attempts, error_text, time.time() + delay))
+        inc("outbox_retries_total", len(ids))
+
+    def _mark(self, ids, assignments, params):
+        with self.db.transaction() as conn:
+            conn.executemany(f"UPDATE outbox SET {assignments} WHERE id = ?", [(*params, i) for i in ids])
+
+    def _next_due(self):
+        row = self.db.fetchone("SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'")
+        return row[0] if row and row[0] is not None else None
+
+    # --- lifecycle -------------------------------------------------------
+    def ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+                self._thread.start()
+
+    def shutdown(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for transport in self.transports.values():
+            transport.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.dispatch()
+            except Exception:
+                logger.exception("outbox dispatch failed")
+            for transport in self.transports.values():
+                transport.close_idle()
+            next_due = self._next_due()
+            wait = self.poll_interval if next_due is None else min(self.poll_interval,
+                                                                   max(0.0, next_due - time.time()))
+            self._wake.wait(wait)
+            self._wake.clear()
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """The process-wide outbox; its dispatcher also retries rows left pending by a previous process."""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox()
+                _outbox.ensure_running()
+    return _outbox
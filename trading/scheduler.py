@@ -0,0 +1,241 @@
+"""
+Per-user trade scheduler.
+
+Each user has trade times in their own timezone ("09:30", "14:00", ...) and a cap
+on scheduled trades per local day. Their next fire time (UTC epoch) is kept in a
+min-heap, so a wake pops only the k users that are due, in O(k log n), instead of
+checking every user each minute. The schedule, the next fire time and the per-day
+count live in SQLite, so the heap is rebuilt on restart, and a fire is committed
+with a compare-and-set on next_fire, so two processes never fire the same slot.
+
+Slots missed while nothing was waking (a cold start, a failed cron ping) are
+fired late if they are at most SCHEDULER_CATCH_UP seconds old and skipped
+otherwise; either way each user's next fire moves past them.
+"""
+import datetime
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import zoneinfo
+
+from trading.db import get_pool
+from trading.telemetry import inc, timer
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DB_PATH", "users.db")
+SCHEDULER_CATCH_UP = float(os.getenv("SCHEDULER_CATCH_UP", 900))  # seconds
+DEFAULT_TRADES_PER_DAY = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trade_schedule (
+    user TEXT PRIMARY KEY,
+    tz TEXT NOT NULL, times TEXT NOT NULL, trades_per_day INTEGER NOT NULL,
+    next_fire REAL, fired_day TEXT, fired_count INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trade_schedule_next_fire ON trade_schedule (next_fire);
+CREATE INDEX IF NOT EXISTS idx_trade_schedule_updated_at ON trade_schedule (updated_at);
+"""
+
+
+def parse_times(times):
+    """"09:30, 14:00" or ["09:30", "14:00"] -> sorted unique datetime.time values."""
+    if isinstance(times, str):
+        times = times.replace(";", ",").split(",")
+    parsed = {datetime.datetime.strptime(t.strip(), "%H:%M").time() for t in times if t.strip()}
+    return sorted(parsed)
+
+
+def next_fire_after(after_ts, tz, times, trades_per_day, fired_day=None, fired_count=0):
+    """
+    First slot strictly after ``after_ts`` on a local day with scheduled trades left.
+    Returns (utc epoch, local ISO date) or (None, None) if the user has no slots.
+    """
+    if not times or trades_per_day < 1:
+        return None, None
+    zone = zoneinfo.ZoneInfo(tz)
+    day = datetime.datetime.fromtimestamp(after_ts, zone).date()
+    for _ in range(8):
+        used = fired_count if day.isoformat() == fired_day else 0
+        if used < trades_per_day:
+            for t in times:
+                ts = datetime.datetime.combine(day, t, tzinfo=zone).timestamp()
+                if ts > after_ts:
+                    return ts, day.isoformat()
+        day += datetime.timedelta(days=1)
+    return None, None
+
+
+class TradeScheduler:
+    def __init__(self, path: str = DB_PATH, catch_up: float = SCHEDULER_CATCH_UP):
+        self.db = get_pool(path)
+        self.db.connection().executescript(SCHEMA)
+        self.catch_up = catch_up
+        self._heap = []    # (next_fire, user); entries that no longer match _next are skipped on pop
+        self._next = {}    # user -> next_fire the heap should honour
+        self._lock = threading.Lock()
+        self._synced_at = 0.0
+        self.sync()
+
+    def __len__(self):
+        return len(self._next)
+
+    # --- schedules --------------------------------------------------------
+    def set_schedule(self, user, tz, times, trades_per_day=DEFAULT_TRADES_PER_DAY, now=None):
+        """Create or replace ``user``'s schedule; raises ValueError for a bad timezone or time."""
+        try:
+            zoneinfo.ZoneInfo(tz)
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError) as e:
+            raise ValueError(f"unknown timezone: {tz}") from e
+        parsed = parse_times(times)
+        now = time.time() if now is None else now
+        row = self.db.fetchone("SELECT fired_day, fired_count FROM trade_schedule WHERE user = ?", (user,))
+        fired_day, fired_count = row if row else (None, 0)
+        next_fire, _ = next_fire_after(now, tz, parsed, int(trades_per_day), fired_day, fired_count)
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO trade_schedule (user, tz, times, trades_per_day, next_fire, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(user) DO UPDATE SET tz=excluded.tz,"
+                " times=excluded.times, trades_per_day=excluded.trades_per_day,"
+                " next_fire=excluded.next_fire, updated_at=excluded.updated_at",
+                (user, tz, json.dumps([t.strftime("%H:%M") for t in parsed]), int(trades_per_day), next_fire,
+                 time.time()))
+        self._push(user, next_fire)
+        return next_fire
+
+    def remove(self, user):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM trade_schedule WHERE user = ?", (user,))
+        self._push(user, None)
+
+    def get_schedule(self, user):
+        row = self.db.fetchone(
+            "SELECT tz, times, trades_per_day, next_fire, fired_day, fired_count FROM trade_schedule"
+            " WHERE user = ?", (user,))
+        if row is None:
+            return None
+        tz, times, per_day, next_fire, fired_day, fired_count = row
+        return {"tz": tz, "times": json.loads(times), "trades_per_day": per_day, "next_fire": next_fire,
+                "fired_day": fired_day, "fired_count": fired_count}
+
+    # --- heap ---------------------------------------------------------------
+    def _push(self, user, next_fire):
+        with self._lock:
+            if next_fire is None:
+                self._next.pop(user, None)
+                return
+            self._next[user] = next_fire
+            heapq.heappush(self._heap, (next_fire, user))
+
+    def sync(self):
+        """Pick up schedules written by other processes since the last sync (all of them the first time)."""
+        started = time.time()
+        rows = self.db.fetchall("SELECT user, next_fire FROM trade_schedule WHERE updated_at >= ?",
+                                (self._synced_at,))
+        with self._lock:
+            if not self._synced_at:
+                self._next = {user: nf for user, nf in rows if nf is not None}
+                self._heap = [(nf, user) for user, nf in self._next.items()]
+                heapq.heapify(self._heap)
+            else:
+                for user, nf in rows:
+                    if nf is None:
+                        self._next.pop(user, None)
+                    elif self._next.get(user) != nf:
+                        self._next[user] = nf
+                        heapq.heappush(self._heap, (nf, user))
+            # Clock skew between writers is far below the sync interval; overlap one second anyway
+            self._synced_at = started - 1.0
+        return len(rows)
+
+    def peek(self):
+        """Earliest (next_fire, user) still valid, or None."""
+        with self._lock:
+            while self._heap and self._next.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0] if self._heap else None
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                next_fire, user = heapq.heappop(self._heap)
+                if self._next.get(user) == next_fire:
+                    del self._next[user]
+                    due.append((user, next_fire))
+        return due
+
+    # --- wake -------------------------------------------------------------
+    def wake(self, handler, now=None):
+        """
+        Fire every due slot: ``handler(user, local_slot_datetime)`` once per slot that is
+        no older than the catch-up window. Returns the number of slots fired.
+        """
+        now = time.time() if now is None else now
+        fired = 0
+        with timer("scheduler_wake_seconds"):
+            for user, expected in self._pop_due(now):
+                fired += self._fire_user(user, expected, now, handler)
+        return fired
+
+    def _fire_user(self, user, expected, now, handler):
+        row = self.db.fetchone(
+            "SELECT tz, times, trades_per_day, next_fire, fired_day, fired_count FROM trade_schedule"
+            " WHERE user = ?", (user,))
+        if row is None:
+            return 0
+        tz, times, per_day, next_fire, fired_day, fired_count = row
+        if next_fire != expected:
+            # Another process fired or rescheduled this user; follow the stored schedule
+            self._push(user, next_fire)
+            return 0
+        times = parse_times(json.loads(times))
+        zone = zoneinfo.ZoneInfo(tz)
+        slots = []
+        slot, day = next_fire, datetime.datetime.fromtimestamp(next_fire, zone).date().isoformat()
+        while slot is not None and slot <= now:
+            if day != fired_day:
+                fired_day, fired_count = day, 0
+            fired_count += 1  # a skipped slot still uses up that day's allowance
+            if now - slot <= self.catch_up:
+                slots.append(slot)
+            else:
+                inc("scheduler_skipped_total")
+                logger.warning("skipping %s's slot at %s: %.0fs late", user,
+                               datetime.datetime.fromtimestamp(slot, zone), now - slot)
+            slot, day = next_fire_after(slot, tz, times, per_day, fired_day, fired_count)
+
+        with self.db.transaction() as conn:
+            claimed = conn.execute(
+                "UPDATE trade_schedule SET next_fire = ?, fired_day = ?, fired_count = ?, updated_at = ?"
+                " WHERE user = ? AND next_fire = ?",
+                (slot, fired_day, fired_count, time.time(), user, expected)).rowcount
+        if not claimed:
+            row = self.db.fetchone("SELECT next_fire FROM trade_schedule WHERE user = ?", (user,))
+            self._push(user, row[0] if row else None)
+            return 0
+        self._push(user, slot)
+        for ts in slots:
+            try:
+                handler(user, datetime.datetime.fromtimestamp(ts, zone))
+            except Exception:
+                logger.exception("scheduled trade for %s failed", user)
+        inc("scheduler_fired_total", len(slots))
+        return len(slots)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> TradeScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = TradeScheduler()
+    return _scheduler
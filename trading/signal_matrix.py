@@ -0,0 +1,116 @@
+"""
+Batch signal evaluation for many symbols at once.
+
+Price windows live in one (symbols x window) matrix, a ring per row, so a tick
+over hundreds of markets is a handful of NumPy passes instead of a Python loop
+of RollingStats calls. Rules and thresholds are the ones in trading.indicators:
+every symbol's price is compared with the window of ticks before it.
+"""
+import numpy as np
+
+from trading.backtest import BUY, HOLD, SELL
+from trading.indicators import (
+    MOMENTUM_MIN_HISTORY, MOMENTUM_UP, MOMENTUM_DOWN,
+    BREAKOUT_MIN_HISTORY, BREAKOUT_UP, BREAKOUT_DOWN,
+    MEAN_REVERSION_MIN_HISTORY, MEAN_REVERSION_LOW, MEAN_REVERSION_HIGH,
+    STRATEGIES,
+)
+
+SIGNAL_NAMES = {BUY: "BUY", HOLD: "HOLD", SELL: "SELL"}
+
+
+class SignalMatrix:
+    """
+    Sliding price windows for ``symbols``. Prices are passed as arrays aligned with
+    ``symbols``; NaN means "no quote this tick" and leaves that row untouched.
+    Empty slots hold NaN, which the NaN-ignoring reductions below skip.
+    """
+
+    def __init__(self, symbols, window: int = 20):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.window = int(window)
+        n = len(self.symbols)
+        self._buf = np.full((n, self.window), np.nan)
+        self._head = np.zeros(n, dtype=np.intp)   # column the next price of each row goes to
+        self._count = np.zeros(n, dtype=np.intp)
+        self._rows = np.arange(n)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def prices(self, price_fn) -> np.ndarray:
+        """Current prices as an array aligned with ``symbols`` (NaN where ``price_fn`` has none)."""
+        return np.array([price_fn(symbol) or np.nan for symbol in self.symbols], dtype=np.float64)
+
+    def push(self, prices) -> None:
+        prices = np.asarray(prices, dtype=np.float64)
+        rows = np.flatnonzero(~np.isnan(prices))
+        cols = self._head[rows]
+        self._buf[rows, cols] = prices[rows]
+        self._head[rows] = (cols + 1) % self.window
+        self._count[rows] = np.minimum(self._count[rows] + 1, self.window)
+
+    def last(self) -> np.ndarray:
+        return self._buf[self._rows, (self._head - 1) % self.window]
+
+    def signals(self, strategy_name: str, prices) -> np.ndarray:
+        """BUY/SELL/HOLD (+1/-1/0) per symbol for ``prices`` against the windows pushed so far."""
+        prices = np.asarray(prices, dtype=np.float64)
+        out = np.full(len(self.symbols), HOLD, dtype=np.int8)
+        if strategy_name == "Momentum":
+            ready = self._count > MOMENTUM_MIN_HISTORY
+            last = self.last()
+            buy, sell = prices > last * MOMENTUM_UP, prices < last * MOMENTUM_DOWN
+        elif strategy_name == "Breakout":
+            ready = self._count > BREAKOUT_MIN_HISTORY
+            if not ready.any():
+                return out
+            buy = prices > np.fmax.reduce(self._buf, axis=1) * BREAKOUT_UP
+            sell = prices < np.fmin.reduce(self._buf, axis=1) * BREAKOUT_DOWN
+        elif strategy_name == "Mean Reversion":
+            ready = self._count > MEAN_REVERSION_MIN_HISTORY
+            if not ready.any():
+                return out
+            mean = np.nansum(self._buf, axis=1) / np.maximum(self._count, 1)
+            buy, sell = prices < mean * MEAN_REVERSION_LOW, prices > mean * MEAN_REVERSION_HIGH
+        else:
+            return out
+        out[ready & sell] = SELL
+        out[ready & buy] = BUY
+        return out
+
+    def all_signals(self, prices) -> dict:
+        """Every built-in strategy's signals for ``prices``, keyed by strategy name."""
+        return {strategy: self.signals(strategy, prices) for strategy in STRATEGIES}
+
+    def update(self, strategy_name: str, prices) -> np.ndarray:
+        """Evaluate the signals for ``prices`` and then add them to the windows."""
+        out = self.signals(strategy_name, prices)
+        self.push(prices)
+        return out
+
+    def window_of(self, symbol) -> np.ndarray:
+        """Oldest-to-newest prices in ``symbol``'s window (a copy)."""
+        i = self.index[symbol]
+        n = self._count[i]
+        return self._buf[i, (self._head[i] - n + np.arange(n)) % self.window]
+
+    def seed(self, symbol, prices) -> None:
+        """Replace ``symbol``'s window with the last ``window`` of ``prices`` (oldest first)."""
+        i = self.index[symbol]
+        prices = np.asarray(prices, dtype=np.float64)[-self.window:]
+        self._buf[i] = np.nan
+        self._buf[i, :len(prices)] = prices
+        self._head[i] = len(prices) % self.window
+        self._count[i] = len(prices)
+
+    def reindex(self, symbols, window: int = None) -> "SignalMatrix":
+        """A matrix over ``symbols`` that keeps the windows of symbols already tracked here."""
+        matrix = SignalMatrix(symbols, window or self.window)
+        for symbol in matrix.symbols:
+            if symbol in self.index:
+                matrix.seed(symbol, self.window_of(symbol))
+        return matrix
@@ -0,0 +1,80 @@
+"""
+Parallel parameter sweep over strategy x min_profit x max_loss.
+
+The price series is copied once into shared memory; worker processes attach to it
+by name instead of receiving a pickled copy per task. Each task covers one
+(strategy, min_profit) pair and loops over every max_loss, reusing the strategy's
+signals, which each worker computes once.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from trading.backtest import as_prices, run_backtest, strategy_signals
+from trading.indicators import STRATEGIES
+
+# Same range and step as the "Min Profit %" / "Max Loss %" sidebar sliders
+SLIDER_GRID = tuple(np.round(np.arange(0.1, 5.0 + 1e-9, 0.1), 1))
+
+RESULT_COLUMNS = ["Strategy", "Min Profit %", "Max Loss %", "Sharpe Ratio", "Max Drawdown",
+                  "Win Ratio", "Trades", "Total P/L"]
+
+# Per-worker state set up by _init_worker
+_shm = None
+_prices = None
+_window = None
+_signals = {}
+
+
+def _init_worker(shm_name, length, window):
+    global _shm, _prices, _window
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _prices = np.ndarray((length,), dtype=np.float64, buffer=_shm.buf)
+    _window = window
+    _signals.clear()
+
+
+def _run_task(strategy, min_profit, max_losses):
+    signals = _signals.get(strategy)
+    if signals is None:
+        signals = _signals[strategy] = strategy_signals(strategy, _prices, _window)
+    rows = []
+    for max_loss in max_losses:
+        m = run_backtest(_prices, strategy, min_profit, max_loss, _window, signals=signals)["metrics"]
+        rows.append((strategy, min_profit, max_loss, m["Sharpe Ratio"], m["Max Drawdown"],
+                     m["Win Ratio"], m["Trades"], m["Total P/L"]))
+    return rows
+
+
+def run_sweep(data, strategies=STRATEGIES, min_profits=SLIDER_GRID, max_losses=SLIDER_GRID,
+              window: int = 20, max_workers: int = None) -> pd.DataFrame:
+    """
+    Backtest every parameter combination and return the results ranked by Sharpe ratio
+    (ties broken by the shallower drawdown, then the higher win ratio). Combinations
+    that never traded sort last.
+    """
+    prices = as_prices(data)
+    max_losses = [float(x) for x in max_losses]
+    shm = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+    try:
+        np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+        rows = []
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                 initializer=_init_worker,
+                                 initargs=(shm.name, len(prices), window)) as pool:
+            futures = [pool.submit(_run_task, strategy, float(mp), max_losses)
+                       for strategy in strategies for mp in min_profits]
+            for f in futures:
+                rows.extend(f.result())
+    finally:
+        shm.close()
+        shm.unlink()
+
+    df = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    traded = df["Trades"] > 0
+    df = df.assign(_traded=traded).sort_values(
+        ["_traded", "Sharpe Ratio", "Max Drawdown", "Win Ratio"], ascending=False, kind="stable")
+    return df.drop(columns="_traded").reset_index(drop=True)
@@ -0,0 +1,291 @@
+"""
+Lightweight latency histograms and counters for the hot paths.
+
+    with timer("price_fetch_seconds", source="hub"):
+        ...
+
+    @timed("bot_tick_seconds")
+    def tick(): ...
+
+Set METRICS_ENABLED=0 to turn recording off: timer() then hands back a shared no-op
+context manager and timed() functions make one flag check per call. Metrics are
+exposed in Prometheus text format via render_prometheus(), an optional HTTP endpoint
+(METRICS_PORT) and an optional textfile-collector file (METRICS_FILE).
+"""
+import bisect
+import contextlib
+import functools
+import http.server
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))        # 0 = no HTTP endpoint
+METRICS_FILE = os.getenv("METRICS_FILE")                # e.g. /data/metrics/mbu.prom
+METRICS_FILE_INTERVAL = float(os.getenv("METRICS_FILE_INTERVAL", 15))
+
+# Seconds; spans in-memory cache hits (~µs) up to slow exchange calls
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(BUCKETS, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate from the buckets (linear within a bucket), as Prometheus' histogram_quantile does."""
+        with self.lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                lo = BUCKETS[i - 1] if i else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+
+class Registry:
+    def __init__(self):
+        self.enabled = METRICS_ENABLED
+        self._histograms = {}   # (name, labels tuple) -> Histogram
+        self._counters = {}     # (name, labels tuple) -> float
+        self._lock = threading.Lock()
+
+    def histogram(self, name, labels=()):
+        key = (name, labels)
+        h = self._histograms.get(key)
+        if h is None:
+            with self._lock:
+                h = self._histograms.setdefault(key, Histogram())
+        return h
+
+    def observe(self, name, seconds, **labels):
+        if self.enabled:
+            self.histogram(name, tuple(sorted(labels.items()))).observe(seconds)
+
+    def inc(self, name, value=1.0, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def snapshot(self):
+        """Rows for the admin panel: one per histogram series and per counter series."""
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        rows = []
+        for (name, labels), h in sorted(histograms):
+            rows.append({"metric": name, "labels": _label_text(labels), "count": h.count,
+                         "mean_ms": h.sum / h.count * 1000 if h.count else 0.0,
+                         "p50_ms": h.quantile(0.5) * 1000, "p95_ms": h.quantile(0.95) * 1000,
+                         "p99_ms": h.quantile(0.99) * 1000})
+        for (name, labels), value in sorted(counters):
+            rows.append({"metric": name, "labels": _label_text(labels), "count": value})
+        return rows
+
+    def render_prometheus(self):
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        out = []
+        typed = set()
+        for (name, labels), h in histograms:
+            if name not in typed:
+                out.append(f"# TYPE mbu_{name} histogram")
+                typed.add(name)
+            with h.lock:
+                counts, total, count = list(h.counts), h.sum, h.count
+            cumulative = 0
+            for bound, c in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += c
+                out.append(f"mbu_{name}_bucket{_label_text(labels + (('le', str(bound)),), braces=True)} {cumulative}")
+            out.append(f"mbu_{name}_sum{_label_text(labels, braces=True)} {total}")
+            out.append(f"mbu_{name}_count{_label_text(labels, braces=True)} {count}")
+        for (name, labels), value in counters:
+            if name not in typed:
+                out.append(f"# TYPE mbu_{name} counter")
+                typed.add(name)
+            out.append(f"mbu_{name}{_label_text(labels, braces=True)} {value}")
+        return "\n".join(out) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _label_text(labels, braces=False):
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in labels)
+    return "{" + body + "}" if braces else body
+
+
+registry = Registry()
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            # Control flow, not a failure (e.g. st.rerun()/st.stop() raise BaseException
+            # subclasses): neither an error nor a complete run worth timing
+            return False
+        registry.histogram(self.name, self.labels).observe(time.perf_counter() - self.start)
+        if exc_type is not None:
+            registry.inc(self.name.replace("_seconds", "_errors_total"), **dict(self.labels))
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+def timer(name, **labels):
+    if not registry.enabled:
+        return _NOOP
+    return _Timer(name, tuple(sorted(labels.items())))
+
+
+def timed(name, **labels):
+    label_key = tuple(sorted(labels.items()))
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name, label_key):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def inc(name, value=1.0, **labels):
+    registry.inc(name, value, **labels)
+
+
+# --- startup report --------------------------------------------------------------
+_process_start = time.time()  # close enough: this module loads with the app's first imports
+_startup = {}  # component -> (seconds, seconds since process start when it finished)
+_startup_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def startup_stage(component):
+    """Time the first run of a component's import/initialization in this process; later runs are not recorded."""
+    if component in _startup:
+        yield
+        return
+    t0 = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - t0
+    with _startup_lock:
+        if component not in _startup:
+            _startup[component] = (elapsed, time.time() - _process_start)
+            logger.info("startup: %s took %.1f ms", component, elapsed * 1000)
+
+
+def startup_report():
+    """Rows in the order components were first loaded."""
+    with _startup_lock:
+        items = list(_startup.items())
+    return [{"component": component, "ms": seconds * 1000, "ready_after_s": ready}
+            for component, (seconds, ready) in items]
+
+
+# --- exposition ----------------------------------------------------------------
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def write_prometheus_file(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(registry.render_prometheus())
+    os.replace(tmp, path)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters(port=METRICS_PORT, path=METRICS_FILE):
+    """Start the HTTP endpoint and/or file writer once per process (no-op if neither is configured)."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    if port:
+        try:
+            server = http.server.ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        except OSError as e:
+            # Another gunicorn worker already serves this port
+            logger.warning("metrics endpoint not started on port %s: %s", port, e)
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    if path:
+        def loop():
+            while True:
+                try:
+                    write_prometheus_file(path)
+                except OSError:
+                    logger.exception("writing %s failed", path)
+                time.sleep(METRICS_FILE_INTERVAL)
+        threading.Thread(target=loop, name="metrics-file", daemon=True).start()
@@ -0,0 +1,179 @@
+"""
+Append-only, memory-mapped columnar tick store.
+
+Layout: ``<root>/<SYMBOL>/<YYYY-MM-DD>/{ts.i8, price.f8, volume.f8}`` with one
+little-endian column file per field (timestamps are int64 epoch milliseconds, UTC,
+as ccxt uses). Each partition has a single writer that appends with O_APPEND, so no
+locks are taken; readers map the files and use the shortest column as the row count,
+which hides a row that is only partly written; the writer cuts such a row off when
+it next opens the partition, so later rows stay aligned. Range reads are zero-copy NumPy views.
+Only the process holding an flock on ``<root>/writer.lock`` appends; in the others
+append() is a no-op, so several gunicorn workers can share one store safely.
+"""
+import datetime
+import fcntl
+import os
+import threading
+
+import numpy as np
+
+TICK_STORE_DIR = os.getenv("TICK_STORE_DIR", "ticks")
+
+COLUMNS = (("ts", "<i8"), ("price", "<f8"), ("volume", "<f8"))
+_DAY_MS = 86_400_000
+
+
+def _symbol_dir(symbol: str) -> str:
+    return symbol.replace("/", "-").replace(":", "_")
+
+
+def _day(ts_ms: int) -> str:
+    return datetime.datetime.fromtimestamp(ts_ms // 1000, datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+def now_ms() -> int:
+    return int(datetime.datetime.now(datetime.timezone.utc).timestamp() * 1000)
+
+
+class TickStore:
+    def __init__(self, root: str = TICK_STORE_DIR):
+        self.root = root
+        self._fds = {}           # (symbol, day) -> tuple of column fds
+        self._fd_lock = threading.Lock()
+        self._writer_fd = None   # held flock on writer.lock once we are the writer
+
+    def is_writer(self) -> bool:
+        if self._writer_fd is not None:
+            return True
+        os.makedirs(self.root, exist_ok=True)
+        fd = os.open(os.path.join(self.root, "writer.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._writer_fd = fd
+        return True
+
+    def _partition(self, symbol: str, day: str) -> str:
+        return os.path.join(self.root, _symbol_dir(symbol), day)
+
+    # --- writes ---------------------------------------------------------
+    def _open(self, symbol, day):
+        key = (symbol, day)
+        fds = self._fds.get(key)
+        if fds is None:
+            with self._fd_lock:
+                fds = self._fds.get(key)
+                if fds is None:
+                    # A new day for this symbol: close yesterday's files
+                    for old in [k for k in self._fds if k[0] == symbol]:
+                        for fd in self._fds.pop(old):
+                            os.close(fd)
+                    path = self._partition(symbol, day)
+                    os.makedirs(path, exist_ok=True)
+                    fds = tuple(os.open(os.path.join(path, f"{name}.{dtype[1:]}"),
+                                        os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                                for name, dtype in COLUMNS)
+                    # Drop the tail of a row a crash or failed write left in some columns only,
+                    # so the next append lines up again (readers already ignore it)
+                    rows = min(os.fstat(fd).st_size // 8 for fd in fds)
+                    for fd in fds:
+                        if os.fstat(fd).st_size != rows * 8:
+                            os.ftruncate(fd, rows * 8)
+                    self._fds[key] = fds
+        return fds
+
+    def append(self, symbol: str, price: float, volume: float = 0.0, ts_ms: int = None):
+        if not self.is_writer():
+            return False
+        ts_ms = now_ms() if ts_ms is None else int(ts_ms)
+        day = _day(ts_ms)
+        ts_fd, price_fd, vol_fd = self._open(symbol, day)
+        try:
+            # Timestamp last, so a reader never sees a timestamp without its price and volume
+            os.write(price_fd, np.float64(price).astype("<f8").tobytes())
+            os.write(vol_fd, np.float64(volume).astype("<f8").tobytes())
+            os.write(ts_fd, np.int64(ts_ms).astype("<i8").tobytes())
+        except OSError:
+            # Reopen (and so realign) the partition on the next append
+            with self._fd_lock:
+                for fd in self._fds.pop((symbol, day), ()):
+                    os.close(fd)
+            raise
+        return True
+
+    def append_many(self, prices: dict, ts_ms: int = None, volumes: dict = None):
+        """Record one tick per symbol, e.g. a market-data hub refresh."""
+        ts_ms = now_ms() if ts_ms is None else int(ts_ms)
+        for symbol, price in prices.items():
+            self.append(symbol, price, (volumes or {}).get(symbol, 0.0), ts_ms)
+
+    def close(self):
+        with self._fd_lock:
+            for fds in self._fds.values():
+                for fd in fds:
+                    os.close(fd)
+            self._fds.clear()
+
+    # --- reads ----------------------------------------------------------
+    def _map_partition(self, path):
+        maps, rows = {}, None
+        for name, dtype in COLUMNS:
+            fname = os.path.join(path, f"{name}.{dtype[1:]}")
+            try:
+                n = os.path.getsize(fname) // 8
+            except OSError:
+                return None
+            rows = n if rows is None else min(rows, n)
+            maps[name] = (fname, dtype)
+        if not rows:
+            return None
+        return {name: np.memmap(fname, dtype=dtype, mode="r", shape=(rows,))
+                for name, (fname, dtype) in maps.items()}
+
+    def days(self, symbol: str):
+        try:
+            return sorted(os.listdir(os.path.join(self.root, _symbol_dir(symbol))))
+        except OSError:
+            return []
+
+    def iter_range(self, symbol: str, start_ms: int = None, end_ms: int = None):
+        """Yield ``{"ts", "price", "volume"}`` zero-copy views per day for ``start <= ts < end``."""
+        first = _day(start_ms) if start_ms is not None else None
+        last = _day(end_ms) if end_ms is not None else None
+        for day in self.days(symbol):
+            if (first and day < first) or (last and day > last):
+                continue
+            cols = self._map_partition(self._partition(symbol, day))
+            if cols is None:
+                continue
+            ts = cols["ts"]
+            lo = int(np.searchsorted(ts, start_ms, "left")) if start_ms is not None else 0
+            hi = int(np.searchsorted(ts, end_ms, "left")) if end_ms is not None else len(ts)
+            if hi > lo:
+                yield {name: col[lo:hi] for name, col in cols.items()}
+
+    def read(self, symbol: str, start_ms: int = None, end_ms: int = None):
+        """Columns for the range; a view when it falls within one day, a concatenated copy otherwise."""
+        parts = list(self.iter_range(symbol, start_ms, end_ms))
+        if len(parts) == 1:
+            return parts[0]
+        return {name: (np.concatenate([p[name] for p in parts]) if parts else np.empty(0, dtype=dtype))
+                for name, dtype in COLUMNS}
+
+    def count(self, symbol: str, start_ms: int = None, end_ms: int = None) -> int:
+        return sum(len(p["ts"]) for p in self.iter_range(symbol, start_ms, end_ms))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_tick_store() -> TickStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TickStore()
+    return _store
@@ -0,0 +1,120 @@
+"""
+Paged trade tables for the dashboard, served from the trade ledger.
+
+A TradeTable lives across reruns (the page keeps it in session state) and only
+touches what changed: refresh() reads just the trades closed since the newest one
+it has seen, folding them into the cached symbol list and per-filter totals, so
+those are queried once per filter rather than on every rerun. Pages are fetched by
+keyset ((closed_at, id) of a row already seen, on the trades indexes) instead of
+OFFSET, so stepping through pages costs one page of rows however deep it is.
+Trades closed within the last LEDGER_FLUSH_INTERVAL may not be visible yet.
+"""
+import datetime
+import threading
+
+import pandas as pd
+
+from trading.ledger import DATE_FORMAT, TRADE_COLUMNS
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def _as_datetime(value):
+    if value is not None and not isinstance(value, datetime.datetime):
+        return datetime.datetime.combine(value, datetime.time())
+    return value
+
+
+def _upto(key):
+    """Exclusive upper bound that still includes the row at ``key``."""
+    return key[0], key[1] + 1
+
+
+class TradeTable:
+    """``user``'s trades closed since ``since`` (e.g. the bot's session start)."""
+
+    def __init__(self, ledger, user, since=None):
+        self.ledger = ledger
+        self.user = user
+        self.since = _as_datetime(since)
+        self._lock = threading.Lock()
+        self._mark = None        # (closed_at, id) of the newest trade folded in so far
+        self._symbols = None     # symbols traded up to _mark, loaded on first use
+        self._totals = {}        # filter key -> matching trades up to _mark
+        self._anchors = {}       # filter key -> {position from the oldest match: (closed_at, id)}
+
+    def refresh(self) -> int:
+        """Fold in the trades closed since the last call (an index range over just those). Returns how many."""
+        with self._lock:
+            if self._mark is None:
+                newest = self.ledger.trades(self.user, start=self.since, limit=1, newest_first=True, keys=True)
+                self._mark = newest[0][0] if newest else ("", 0)
+                return 0
+            new = self.ledger.trades(self.user, start=self.since, after=self._mark, keys=True)
+            if not new:
+                return 0
+            self._mark = new[-1][0]
+            rows = [row for _, row in new]
+            if self._symbols is not None:
+                self._symbols.update(row["Symbol"] for row in rows)
+            for key in self._totals:
+                self._totals[key] += sum(1 for row in rows if self._matches(key, row))
+            return len(rows)
+
+    @property
+    def symbols(self):
+        self.refresh()
+        with self._lock:
+            if self._symbols is None:
+                self._symbols = set(self.ledger.trade_symbols(self.user, start=self.since, before=_upto(self._mark)))
+            return sorted(self._symbols)
+
+    def _filter_key(self, symbols, sides, start, end):
+        start, end = _as_datetime(start), _as_datetime(end)
+        if self.since is not None and (start is None or start < self.since):
+            start = self.since
+        return (tuple(sorted(symbols or ())), tuple(sorted(sides or ())),
+                start.strftime(DATE_FORMAT) if start else None, end.strftime(DATE_FORMAT) if end else None)
+
+    @staticmethod
+    def _matches(key, row):
+        symbols, sides, start, end = key
+        return ((not symbols or row["Symbol"] in symbols) and (not sides or row["Side"] in sides)
+                and (start is None or row["Date"] >= start) and (end is None or row["Date"] < end))
+
+    def _query(self, key, **kwargs):
+        symbols, sides, start, end = key
+        return self.ledger.trades(self.user, start=start, end=end, symbols=symbols or None, sides=sides or None,
+                                  keys=True, **kwargs)
+
+    def page(self, page: int = 0, page_size: int = DEFAULT_PAGE_SIZE, symbols=None, sides=None,
+             start=None, end=None):
+        """
+        Newest-first page ``page`` of the trades matching every given filter
+        (``start <= Date < end``). Returns (DataFrame of at most ``page_size`` rows, total matches).
+        """
+        self.refresh()
+        key = self._filter_key(symbols, sides, start, end)
+        with self._lock:
+            upto = _upto(self._mark)
+            total = self._totals.get(key)
+            if total is None:
+                total = self._totals[key] = self.ledger.count_trades(
+                    self.user, key[2], key[3], key[0] or None, key[1] or None, before=upto)
+            # Positions counted from the oldest match stay put as new trades arrive
+            hi = total - page * page_size
+            lo = max(0, hi - page_size)
+            rows = []
+            if hi > 0:
+                anchors = self._anchors.setdefault(key, {})
+                if lo - 1 in anchors:
+                    rows = self._query(key, after=anchors[lo - 1], before=upto, limit=hi - lo)[::-1]
+                elif hi in anchors:
+                    rows = self._query(key, before=anchors[hi], limit=hi - lo, newest_first=True)
+                elif total - hi <= lo:
+                    rows = self._query(key, before=upto, limit=hi - lo, offset=total - hi, newest_first=True)
+                else:
+                    rows = self._query(key, before=upto, limit=hi - lo, offset=lo)[::-1]
+                if rows:
+                    anchors[hi - 1], anchors[hi - len(rows)] = rows[0][0], rows[-1][0]
+        return pd.DataFrame([row for _, row in rows], columns=list(TRADE_COLUMNS)), total
@@ -0,0 +1,314 @@
+import datetime
+import logging
+import os
+import threading
+import time
+
+from trading.bars import BarAggregator
+from trading.bot import BotState, run_trading_bot_logic
+from trading.coordination import WORKER_COORDINATION_DIR, Coordinator
+from trading.ledger import TradeLedger
+from trading.market_hub import MarketDataHub, get_hub
+from trading.netting import OrderNetter, demo_send
+from trading.outbox import get_outbox
+from trading.scheduler import TradeScheduler, get_scheduler
+from trading.telemetry import timed
+
+logger = logging.getLogger(__name__)
+
+BOT_TICK_INTERVAL = float(os.getenv("BOT_TICK_INTERVAL", 10))  # seconds between bot ticks
+TRADE_ALERTS = os.getenv("TRADE_ALERTS", "0") == "1"  # email users their closed trades (batched)
+SCHEDULER_SYNC_INTERVAL = float(os.getenv("SCHEDULER_SYNC_INTERVAL", 60))  # seconds between schedule re-reads
+
+
+class TradingWorker:
+    """
+    Per-process background scheduler that ticks every running user's bot at a fixed
+    cadence, independent of Streamlit reruns or whether a browser tab is open.
+    Pages register/configure bots and read their BotState; they never run ticks.
+
+    With a ``coordinator`` (several gunicorn workers) a bot is ticked only by the
+    worker holding its lease. The others serve the dashboard a copy reloaded from the
+    ledger and forward start/stop/configure to the holder as commands.
+    """
+
+    def __init__(self, interval: float = BOT_TICK_INTERVAL, hub: MarketDataHub = None, ledger=None,
+                 send_order=demo_send, outbox=None, scheduler: TradeScheduler = None,
+                 coordinator: Coordinator = None):
+        self.interval = interval
+        # Orders from all bots in a tick are netted per symbol and sent through send_order
+        self.send_order = send_order
+        # Prices come from the shared hub: one fetch per symbol per tick, however many bots trade it
+        self.hub = hub or MarketDataHub(interval=interval)
+        self.ledger = ledger
+        self.outbox = outbox
+        # Starts users' bots at their scheduled local times; woken on every tick
+        self.scheduler = scheduler
+        self._scheduler_synced = time.monotonic()
+        self.coordinator = coordinator
+        self.bars = {}  # symbol -> BarAggregator, shared by every bot trading the symbol
+        self._bots = {}
+        self._views = {}  # user -> (read-only BotState from the ledger, monotonic load time); bots leased elsewhere
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- registry -------------------------------------------------------
+    def get(self, user):
+        with self._lock:
+            return self._bots.get(user)
+
+    def bot_for(self, user, **settings) -> BotState:
+        if not self._is_local(user):
+            return self._view(user, **settings)
+        with self._lock:
+            state = self._bots.get(user)
+            if state is None:
+                state = self._bots[user] = BotState(user, ledger=self.ledger, **settings)
+                state.outbox = self.outbox
+                state.restore()
+            return state
+
+    def _view(self, user, **settings) -> BotState:
+        """The ledger's copy of a bot another worker ticks, reloaded at most once per interval."""
+        with self._lock:
+            view, loaded = self._views.get(user, (None, 0.0))
+            if view is None or time.monotonic() - loaded >= self.interval:
+                view = BotState(user, ledger=self.ledger, **settings)
+                view.restore()
+                view.ledger = None  # never written back: the lease holder owns the ledger rows
+                self._views[user] = (view, time.monotonic())
+            return view
+
+    def _is_local(self, user):
+        """Whether this worker ticks ``user``'s bot, taking the lease if the ring assigns it here."""
+        c = self.coordinator
+        if c is None or c.holds(user):
+            return True
+        return c.owns(user) and user in self._take_over([user])
+
+    def _take_over(self, users):
+        """Take or renew leases; bots newly leased here are reloaded from the ledger."""
+        before = self.coordinator.held()
+        got = self.coordinator.acquire(users)
+        with self._lock:
+            for user in got - before:
+                self._bots.pop(user, None)
+                self._views.pop(user, None)
+        return got
+
+    def resume(self):
+        """Re-register every bot the ledger says was running (e.g. after a restart)."""
+        if self.ledger is None:
+            return 0
+        users = self.ledger.running_users()
+        if self.coordinator is not None:
+            # Bots are picked up by whichever worker the ring assigns them to, on its next tick
+            self.ensure_running()
+            return len(users)
+        for user in users:
+            self.bot_for(user)
+        if users:
+            self.ensure_running()
+        return len(users)
+
+    def start_bot(self, user, strategy, min_profit, max_loss, symbols, timeframe="Continuous",
+                  signal_timeframe=None) -> BotState:
+        if not self._is_local(user):
+            self.coordinator.post(user, "start", strategy=strategy, min_profit=min_profit, max_loss=max_loss,
+                                  symbols=list(symbols), timeframe=timeframe, signal_timeframe=signal_timeframe)
+            return self._view(user)
+        state = self.bot_for(user)
+        state.configure(strategy, min_profit, max_loss, symbols, timeframe, signal_timeframe)
+        state.start()
+        self.ensure_running()
+        return state
+
+    def configure_bot(self, user, strategy, min_profit, max_loss, symbols, timeframe="Continuous",
+                      signal_timeframe=None):
+        if self._is_local(user):
+            self.bot_for(user).configure(strategy, min_profit, max_loss, symbols, timeframe, signal_timeframe)
+            return
+        view = self._view(user)
+        settings = (strategy, min_profit, max_loss, list(symbols), timeframe, signal_timeframe)
+        if settings != (view.strategy, view.min_profit, view.max_loss, view.symbols, view.timeframe,
+                        view.signal_timeframe):
+            self.coordinator.post(user, "configure", strategy=strategy, min_profit=min_profit, max_loss=max_loss,
+                                  symbols=list(symbols), timeframe=timeframe, signal_timeframe=signal_timeframe)
+            view.configure(*settings)  # show the change until the holder's save comes back
+
+    def stop_bot(self, user, reason=None):
+        if not self._is_local(user):
+            self.coordinator.post(user, "stop", reason=reason)
+            view = self._view(user)
+            with view.lock:
+                view.running = False
+            return
+        state = self.get(user)
+        if state is not None:
+            state.stop(reason)
+
+    def _apply(self, user, action, payload):
+        """Run a command another worker's dashboard posted for a bot leased here."""
+        state = self.bot_for(user)
+        if action == "stop":
+            state.stop(payload.get("reason"))
+            return
+        if "strategy" in payload:
+            state.configure(payload["strategy"], payload["min_profit"], payload["max_loss"], payload["symbols"],
+                            payload["timeframe"], payload["signal_timeframe"])
+        if action == "start":
+            with state.lock:
+                if not (payload.get("scheduled") and state.running):
+                    state.start()
+                    if payload.get("scheduled"):
+                        state.log(f"Scheduled session started at {payload['scheduled']}.")
+
+    def coordinate(self):
+        """
+        Heartbeat, then lease the running bots the ring assigns here (renewing the ones
+        already held) and hand the rest back. Returns the users leased here.
+        """
+        c = self.coordinator
+        c.heartbeat()
+        with self._lock:
+            local_running = {u for u, s in self._bots.items() if s.running}
+        ledger_running = set(self.ledger.running_users())
+        wanted = ledger_running | set(c.pending_users()) | local_running
+        mine = {u for u in wanted if c.owns(u)}
+        leaving = c.held() - mine
+        if leaving:
+            self.ledger.flush()  # the next holder restores from the ledger
+            with self._lock:
+                for user in leaving:
+                    self._bots.pop(user, None)
+            c.release(leaving)
+        held = self._take_over(mine)
+        for user in held & ledger_running:
+            self.bot_for(user)  # load bots leased here after a restart or failover
+        for user, action, payload in c.take_commands(held):
+            try:
+                self._apply(user, action, payload)
+            except Exception:
+                logger.exception("command %s for %s failed", action, user)
+        return held
+
+    def running_bots(self):
+        with self._lock:
+            bots = [s for s in self._bots.values() if s.running]
+        if self.coordinator is not None:
+            bots = [s for s in bots if self.coordinator.holds(s.user)]
+        return bots
+
+    # --- scheduler ------------------------------------------------------
+    def ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="trading-worker", daemon=True)
+                self._thread.start()
+
+    def shutdown(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.coordinator is not None:
+            if self.ledger is not None:
+                self.ledger.flush()
+            self.coordinator.shutdown()
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            self.tick()
+            if self.scheduler is not None:
+                self.wake_scheduler()
+            next_tick += self.interval
+            now = time.monotonic()
+            if next_tick < now:
+                # Fell behind: skip the missed slots rather than firing a burst of catch-up ticks
+                missed = int((now - next_tick) // self.interval) + 1
+                next_tick += missed * self.interval
+                logger.warning("trading worker fell behind by %d tick(s)", missed)
+            self._stop.wait(next_tick - now)
+
+    def wake_scheduler(self):
+        """Start the bots whose scheduled session is due (pops only the due users)."""
+        try:
+            if time.monotonic() - self._scheduler_synced >= SCHEDULER_SYNC_INTERVAL:
+                self.scheduler.sync()  # schedules saved by other processes
+                self._scheduler_synced = time.monotonic()
+            return self.scheduler.wake(self._scheduled_start)
+        except Exception:
+            logger.exception("scheduler wake failed")
+            return 0
+
+    def _scheduled_start(self, user, slot):
+        if not self._is_local(user):
+            self.coordinator.post(user, "start", scheduled=f"{slot:%H:%M %Z}")
+            return
+        state = self.bot_for(user)
+        with state.lock:
+            if state.running:
+                state.log(f"Scheduled session at {slot:%H:%M %Z}: bot already running.")
+                return
+            state.start()
+            state.log(f"Scheduled session started at {slot:%H:%M %Z}.")
+
+    @timed("bot_tick_seconds")
+    def tick(self):
+        now = datetime.datetime.now()
+        if self.coordinator is not None:
+            try:
+                self.coordinate()
+            except Exception:
+                # Leases not renewed simply lapse; bots whose lease ran out are skipped below
+                logger.exception("worker coordination failed")
+        bots = self.running_bots()
+        symbols = set()
+        for state in bots:
+            symbols.update(state.symbols)
+        prices = {}
+        if symbols:
+            self.hub.subscribe("trading-worker", symbols)
+            prices = self.hub.prices(symbols, max_age=self.interval)
+            now_ms = int(time.time() * 1000)
+            for symbol, price in prices.items():
+                aggregator = self.bars.get(symbol)
+                if aggregator is None:
+                    aggregator = self.bars[symbol] = BarAggregator()
+                aggregator.update(price, 0.0, now_ms)
+        netter = OrderNetter()
+        for state in bots:
+            try:
+                if state.end_time and now > state.end_time:
+                    state.stop(f"Trading period of {state.timeframe} ended. Bot stopped.")
+                    continue
+                run_trading_bot_logic(state, prices.get, orders=netter, bars=self.bars)
+            except Exception as e:
+                logger.exception("bot tick failed for %s", state.user)
+                with state.lock:
+                    state.log(f"Tick failed: {e}")
+        if len(netter):
+            netter.flush(self.send_order)
+        return netter.stats
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker() -> TradingWorker:
+    """The process-wide worker; survives Streamlit reruns because modules are cached."""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = TradingWorker(hub=get_hub(), ledger=TradeLedger(),
+                                        outbox=get_outbox() if TRADE_ALERTS else None,
+                                        scheduler=get_scheduler(),
+                                        coordinator=Coordinator() if WORKER_COORDINATION_DIR else None)
+                _worker.resume()
+                if len(_worker.scheduler) or _worker.coordinator is not None:
+                    _worker.ensure_running()
+    return _worker